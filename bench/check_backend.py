@@ -0,0 +1,98 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+"""
+A check of the remote backend (see src/crawl_backend.py) against a local stand-in server: two Scrapers share the queue,
+the index of seen links and the results of a backend server started with start_server, and crawl the synthetic job
+portal (see bench/portal.py) together. Every job ad must be stored on the server exactly once.
+
+Example (from the repository's root directory):
+    python bench/check_backend.py --engine process thread
+"""
+import threading  # The two Scrapers crawling at the same time
+import tempfile  # Savefile of the backend server
+import argparse  # Command line settings
+import shutil  # Removal of the temporary files
+import csv  # Reading the server's savefile
+import sys  # Python interpreter of the check
+import os  # Module with tools for working with files and folders
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from portal import Portal, start_portal  # Synthetic job portal
+from run_bench import bench_func  # Scraping function of the portal
+
+
+def check_backend(address, ads, engine="process", threads=2):
+    """
+    Crawls the portal with two Scrapers connected to the same local backend server. The first Scraper puts the portal's
+    first page into the shared queue, while the second one only consumes the queue.
+    :param address: the address of the portal's first page.
+    :param ads: the number of job ads on the portal.
+    :param engine: the engine of both Scrapers, "process" or "thread".
+    :param threads: the number of threads of each Scraper.
+    :return: a list of the problems found (empty if the check passed).
+    """
+    from custom_driver import Driver
+    from custom_scraper import Scraper
+    from crawl_backend import start_server, RemoteBackend
+    folder = tempfile.mkdtemp(prefix="check_backend_")
+    server = start_server(authkey=b"check", to_save=os.path.join(folder, "results.csv"))
+    try:
+        driver = Driver("", "", static=True, name="check")
+        scrapers = [Scraper(name, [address], num_of_threads=threads, driver=driver) for name in ("check_a", "check_b")]
+        outputs, errors = dict(), []
+
+        def run(scraper, links):
+            try:
+                outputs[scraper.name] = scraper.start(bench_func, links, sleeptime=0, tries=1, dedup=True,
+                                                      engine=engine, backend=RemoteBackend(server.address, b"check"))
+            except Exception as e:
+                errors.append("%s: %s: %s" % (scraper.name, type(e).__name__, e))
+
+        runs = [threading.Thread(target=run, args=(scrapers[0], None)),
+                threading.Thread(target=run, args=(scrapers[1], []))]
+        for thread in runs:
+            thread.start()
+        for thread in runs:
+            thread.join()
+        driver.quit()
+        backend = RemoteBackend(server.address, b"check")
+        with open(os.path.join(folder, "results.csv"), encoding="utf8", newline="") as file:
+            links = [row[0] for row in csv.reader(file, delimiter=";", quotechar="\"")]
+        returned = sum(len(output[0]) for output in outputs.values())
+        if backend.results.count() != ads:
+            errors.append("%d rows stored on the server instead of %d" % (backend.results.count(), ads))
+        if len(set(links)) != len(links):
+            errors.append("%d job ads stored more than once" % (len(links) - len(set(links))))
+        if returned != backend.results.count():
+            errors.append("the Scrapers returned %d rows, but %d were stored" % (returned, backend.results.count()))
+        if backend.results.get_failed():
+            errors.append("%d unsuccessful connections" % len(backend.results.get_failed()))
+        return errors
+    finally:
+        server.shutdown()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check of the remote backend against a local stand-in server.")
+    parser.add_argument("--engine", nargs="+", default=["process", "thread"], choices=("process", "thread"))
+    parser.add_argument("--threads", type=int, default=2, help="number of threads of each Scraper")
+    parser.add_argument("--ads", type=int, default=40, help="number of job ads on the portal")
+    args = parser.parse_args()
+    # No ad fails or is slow, so every ad must be stored
+    portal = Portal(args.ads, per_page=10, slow_every=0, fail_every=0)
+    process, address = start_portal(portal)
+    failed = False
+    try:
+        for engine in args.engine:
+            errors = check_backend(address, args.ads, engine, args.threads)
+            print("%-7s %s" % (engine, "OK" if not errors else "FAILED: " + "; ".join(errors)), flush=True)
+            failed = failed or bool(errors)
+    finally:
+        process.terminate()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+"""
+A check of the circuit breakers (see src/retries.py): the half-open probe of a paused host must not get stuck when its
+item goes back into the queue (e.g. because the politeness scheduler holds the host back), and a host whose failed items
+were all given up must not stay paused. The synthetic job portal (see bench/portal.py) fails every second job ad, so
+its circuit opens again and again while the crawl runs; the crawl must still finish.
+
+Example (from the repository's root directory):
+    python bench/check_breaker.py --engine process thread
+"""
+import threading  # Crawling with a time limit
+import argparse  # Command line settings
+import time  # Waiting for the end of a pause
+import sys  # Python interpreter of the check
+import os  # Module with tools for working with files and folders
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from portal import Portal, start_portal  # Synthetic job portal
+from run_bench import bench_func  # Scraping function of the portal
+
+
+def check_states():
+    """
+    Checks the states of a circuit breaker without crawling.
+    :return: a list of the problems found (empty if the check passed).
+    """
+    from retries import CircuitBreaker
+    errors, host = [], "portal"
+    breaker = CircuitBreaker(dict(), threading.Lock(), threshold=2, cooldown=0.01, probe_timeout=60)
+    breaker.failure(host, "a")
+    breaker.failure(host, "b")
+    time.sleep(0.02)
+    if breaker.allow(host, "c") or not breaker.allow(host, "d"):
+        errors.append("the paused host did not let exactly one probe through")
+    if breaker.allow(host, "c"):
+        errors.append("the probe's own item was held back")
+    # The probe's item goes back into the queue, so another item may probe the host
+    breaker.cancel(host, "c")
+    if breaker.allow(host, "d"):
+        errors.append("the probe was not released when its item went back into the queue")
+    breaker.forget(host, "a")
+    breaker.forget(host, "b")
+    if host in breaker.states:
+        errors.append("the host is still paused after its failed items were given up: %s" % (breaker.states[host],))
+    breaker = CircuitBreaker(dict(), threading.Lock(), threshold=1, cooldown=0, probe_timeout=0)
+    breaker.failure(host, "a")
+    if breaker.allow(host, "b") or breaker.allow(host, "c"):
+        errors.append("the probe of a worker that never reported back did not time out")
+    return errors
+
+
+def check_crawl(address, ads, engine="process", threads=3, limit=120):
+    """
+    Crawls the portal with a sensitive circuit breaker and a short politeness interval, so that the probes of the host
+    are often put back into the queue.
+    :param address: the address of the portal's first page.
+    :param ads: the number of job ads on the portal.
+    :param engine: the engine of the Scraper, "process" or "thread".
+    :param threads: the number of threads of the Scraper.
+    :param limit: the number of seconds the crawl may take.
+    :return: a list of the problems found (empty if the check passed).
+    """
+    from custom_driver import Driver
+    from custom_scraper import Scraper
+    driver = Driver("", "", static=True, name="check")
+    scraper = Scraper("check_breaker", [address], num_of_threads=threads, driver=driver)
+    outputs, errors = [], []
+
+    def run():
+        try:
+            outputs.extend(scraper.start(bench_func, sleeptime=0, breaker_threshold=3, breaker_cooldown=0.2,
+                                         host_interval=0.05, engine=engine))
+        except Exception as e:
+            errors.append("%s: %s" % (type(e).__name__, e))
+
+    crawl = threading.Thread(target=run, daemon=True)
+    crawl.start()
+    crawl.join(limit)
+    if crawl.is_alive():
+        return ["the crawl did not finish in %d seconds" % limit]
+    driver.quit()
+    if errors:
+        return errors
+    # Every ad must be scraped, except the failing ones, which are given up after their last attempt
+    reasons = sorted(set(failure.reason for failure in outputs[2]))
+    if len(outputs[0]) != ads - ads // 2:
+        errors.append("%d job ads scraped instead of %d" % (len(outputs[0]), ads - ads // 2))
+    if len(outputs[2]) != ads // 2 or reasons != ["HTTP status 500"]:
+        errors.append("%d unsuccessful connections instead of %d (%s)" % (len(outputs[2]), ads // 2, ", ".join(reasons)))
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check of the circuit breakers on a portal with failing pages.")
+    parser.add_argument("--engine", nargs="+", default=["process", "thread"], choices=("process", "thread"))
+    parser.add_argument("--threads", type=int, default=3, help="number of threads of the Scraper")
+    parser.add_argument("--ads", type=int, default=40, help="number of job ads on the portal")
+    parser.add_argument("--limit", type=int, default=120, help="number of seconds a crawl may take")
+    args = parser.parse_args()
+    errors = check_states()
+    print("%-7s %s" % ("states", "OK" if not errors else "FAILED: " + "; ".join(errors)), flush=True)
+    failed = bool(errors)
+    # Every second ad fails with the HTTP status 500
+    portal = Portal(args.ads, per_page=10, slow_every=0, fail_every=2)
+    process, address = start_portal(portal)
+    try:
+        for engine in args.engine:
+            errors = check_crawl(address, args.ads, engine, args.threads, args.limit)
+            print("%-7s %s" % (engine, "OK" if not errors else "FAILED: " + "; ".join(errors)), flush=True)
+            failed = failed or bool(errors)
+            if errors and errors[0].startswith("the crawl did not finish"):
+                # The workers of the stuck crawl would keep the interpreter alive
+                process.terminate()
+                os._exit(1)
+    finally:
+        process.terminate()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
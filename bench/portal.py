@@ -0,0 +1,127 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+"""
+A synthetic job portal served over HTTP on the local machine, used as a stand-in site for the benchmarks (see
+bench/run_bench.py). The portal has listing pages with links to job ad detail pages and to the next listing page, a
+robots file, and a share of slow and failing detail pages. Every page is generated from its number, so the portal is the
+same in every benchmark run.
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler  # Serving the portal
+from multiprocessing import Process, Pipe  # Running the portal next to the benchmarked Scraper
+import time  # Delays of the slow pages
+import re  # Parsing the page addresses
+
+ROBOTS = "User-agent: *\nDisallow: /private/\n"
+
+
+class Portal(object):
+    """The layout of the synthetic portal: the number of job ads, the ads per listing page and the slow/failing ads."""
+
+    def __init__(self, ads=500, per_page=20, slow_every=25, slow_delay=0.2, fail_every=50):
+        """
+        :param ads: the number of job ad detail pages.
+        :param per_page: the number of ads linked from a listing page.
+        :param slow_every: every n-th ad responds after 'slow_delay' seconds (0 for none).
+        :param slow_delay: the delay of the slow ads in seconds.
+        :param fail_every: every n-th ad responds with the HTTP status 500 (0 for none).
+        """
+        self.ads = ads
+        self.per_page = per_page
+        self.slow_every = slow_every
+        self.slow_delay = slow_delay
+        self.fail_every = fail_every
+
+    @property
+    def listings(self):
+        """The number of listing pages."""
+        return -(-self.ads // self.per_page)
+
+    def pages(self):
+        """Returns the number of pages a full crawl of the portal visits (listings and ads, including failing ones)."""
+        return self.listings + self.ads
+
+    def listing(self, number):
+        """Returns the HTML code of a listing page."""
+        links = "".join('<li><a class="ad" href="/ad/%d">Job ad %d</a></li>' % (ad, ad)
+                        for ad in range(number * self.per_page, min((number + 1) * self.per_page, self.ads)))
+        if number + 1 < self.listings:
+            links += '<a class="next" href="/list/%d">Next</a>' % (number + 1)
+        return ("<html><head><meta charset='utf-8'><title>Listing %d</title></head><body><h1>Jobs, page %d</h1>"
+                "<ul>%s</ul><a href='/private/admin'>Admin</a></body></html>" % (number, number + 1, links))
+
+    @staticmethod
+    def ad(number):
+        """Returns the HTML code of a job ad detail page."""
+        return ("<html><head><meta charset='utf-8'><title>Job ad %d</title><script>var t=%f;</script></head><body>"
+                "<h1 class='title'>Delovno mesto %d</h1><span class='employer'>Podjetje %d d.o.o.</span>"
+                "<span class='location'>Ljubljana</span><span class='salary'>%d,00</span>"
+                "<span class='date'>2024-%02d-%02d</span><div class='text'>%s</div></body></html>"
+                % (number, time.time(), number, number % 97, 1200 + number % 800, 1 + number % 12, 1 + number % 28,
+                   "Opis delovnega mesta. " * 40))
+
+    def respond(self, path):
+        """Returns the HTTP status, the delay in seconds and the body of a page."""
+        if path == "/robots.txt":
+            return 200, 0, ROBOTS
+        match = re.match(r"^/(list|ad)/(\d+)$", path)
+        if path == "/":
+            return 200, 0, self.listing(0)
+        if match is None:
+            return 404, 0, "Not found"
+        number = int(match.group(2))
+        if match.group(1) == "list":
+            return (200, 0, self.listing(number)) if number < self.listings else (404, 0, "Not found")
+        if number >= self.ads:
+            return 404, 0, "Not found"
+        if self.fail_every and number % self.fail_every == self.fail_every - 1:
+            return 500, 0, "Internal server error"
+        delay = self.slow_delay if self.slow_every and number % self.slow_every == self.slow_every - 1 else 0
+        return 200, delay, self.ad(number)
+
+
+def _serve(portal, port, connection):
+    """Serves the portal until the process is terminated; the chosen port is sent through the connection."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, delay, body = portal.respond(self.path.split("?")[0])
+            if delay:
+                time.sleep(delay)
+            body = body.encode("utf8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/%s; charset=utf-8" % ("plain" if self.path == "/robots.txt"
+                                                                          else "html"))
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    connection.send(server.server_address[1])
+    server.serve_forever()
+
+
+def start_portal(portal=None, port=0):
+    """
+    Starts the portal in a child process, so the server does not compete with the benchmarked Scraper for the GIL.
+    :param portal: the layout of the portal (Portal); if left None, the default layout is used.
+    :param port: the local port of the portal; 0 selects a free port.
+    :return: the process of the portal (stop it with its method 'terminate') and the address of its first page.
+    """
+    portal = Portal() if portal is None else portal
+    receiver, sender = Pipe(duplex=False)
+    process = Process(target=_serve, args=(portal, port, sender), daemon=True)
+    process.start()
+    return process, "http://127.0.0.1:%d/list/0" % receiver.recv()
+
+
+if __name__ == "__main__":
+    _process, _address = start_portal(port=8080)
+    print("Serving the synthetic job portal at %s (Ctrl+C to stop)" % _address)
+    try:
+        _process.join()
+    except KeyboardInterrupt:
+        _process.terminate()
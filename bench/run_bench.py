@@ -0,0 +1,203 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the crawl engine against the synthetic job portal (see bench/portal.py). Every combination of the given
+settings is run in its own Python process with a full crawl of the portal, and the results are printed as a table (and
+optionally saved to a JSON file, so the runs before and after a change can be compared).
+
+Example (from the repository's root directory):
+    python bench/run_bench.py --threads 1 4 8 --engine process thread --output memory csv.gz --json bench.json
+"""
+from itertools import product  # All combinations of the benchmarked settings
+import subprocess  # Every benchmark run in its own process
+import tempfile  # Savefiles and results of the runs
+import argparse  # Command line settings
+import shutil  # Removal of the temporary files
+import json  # Results of the runs
+import time  # Module to work with time objects
+import sys  # Python interpreter of the runs
+import os  # Module with tools for working with files and folders
+try:
+    import resource  # Peak memory of a process on Unix systems (optional)
+except ImportError:
+    resource = None
+try:
+    import psutil  # Peak memory of a process on Windows (optional)
+except ImportError:
+    psutil = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from portal import Portal, start_portal  # Synthetic job portal
+
+OUTPUTS = ("memory", "csv", "csv.gz", "stream")
+
+
+def bench_func(driver, **kwargs):
+    """The scraping function of the benchmarks: listing pages give the links, job ad pages give a row each."""
+    soup = driver.soup
+    if "/list/" in driver.current_url:
+        return [], [], [driver.complete_link(a.get("href")) for a in soup.select("a.ad, a.next")]
+    return [[driver.current_url] + [soup.find(class_=field).text for field in ("title", "employer", "location",
+                                                                                  "salary", "date")]], [], []
+
+
+def _percentile(values, share):
+    """Returns the given share (0 to 1) percentile of the values, None if there are none."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(share * (len(values) - 1))))]
+
+
+def _peak_rss():
+    """Returns the peak memory (resident set size) of this process and of its largest finished child in MB."""
+    if resource is not None:
+        unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit)
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        return getattr(memory, "peak_wset", memory.rss) / 1024 / 1024, None
+    return None, None
+
+
+def run_once(config, address):
+    """
+    Crawls the portal once with the given settings and returns the measurements.
+    :param config: a dictionary of the settings: 'engine', 'mp_func', 'threads', 'sleeptime', 'output', 'browser',
+    'executable_path' and 'bins_path'.
+    :param address: the address of the portal's first page.
+    :return: a dictionary with the settings and the measurements.
+    """
+    from custom_driver import Driver
+    from custom_scraper import Scraper
+    folder = tempfile.mkdtemp(prefix="bench_")
+    try:
+        to_save = "" if config["output"] == "memory" else os.path.join(folder, "results.csv" + (
+            ".gz" if config["output"] == "csv.gz" else ""))
+        driver = Driver(config["executable_path"], config["bins_path"], static=not config["browser"], name="bench")
+        scraper = Scraper("bench", [address], num_of_threads=config["threads"], driver=driver, to_save=to_save)
+        metrics_path = os.path.join(folder, "metrics.jsonl")
+        started = time.time()
+        # The failing ads fail on every attempt, so their retries would only measure the backoff delays
+        characteristics, _, unsuccess, metrics = scraper.start(bench_func, sleeptime=config["sleeptime"], tries=1,
+                                                               mp_func=config["mp_func"], engine=config["engine"],
+                                                               stream=config["output"] == "stream", dedup=True,
+                                                               metrics=metrics_path)
+        elapsed = time.time() - started
+        scraper.close()
+        with open(metrics_path, encoding="utf8") as file:
+            records = [json.loads(line) for line in file]
+        summary = metrics.summary()
+        latencies = [page["total"] * 1000 for page in records if not page["failed"]]
+        rss, rss_children = _peak_rss()
+        worker_seconds = elapsed * config["threads"]
+        busy = sum(page["total"] + page["queue_wait"] + page["politeness_wait"] for page in records)
+        return dict(config, pages=len(records), failed=len(unsuccess), seconds=elapsed,
+                    pages_per_second=len(records) / elapsed, p50_ms=_percentile(latencies, 0.5),
+                    p99_ms=_percentile(latencies, 0.99), rss_mb=rss, rss_children_mb=rss_children,
+                    queue_ms=summary["stages"]["queue_wait"] / max(len(records), 1) * 1000,
+                    overhead=max(0.0, 1 - busy / worker_seconds), bytes=summary["bytes"])
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def run_benchmarks(configs, address, repeat=1, verbose=False, timeout=600):
+    """Runs every configuration 'repeat' times, each in a new Python process, and returns the measurements."""
+    results = []
+    for config in configs:
+        for _ in range(repeat):
+            handle, result_path = tempfile.mkstemp(suffix=".json")
+            os.close(handle)
+            try:
+                process = subprocess.run([sys.executable, os.path.abspath(__file__), "--single", json.dumps(config),
+                                          "--address", address, "--result", result_path],
+                                         stdout=None if verbose else subprocess.DEVNULL,
+                                         stderr=None if verbose else subprocess.PIPE, timeout=timeout)
+                if process.returncode == 0:
+                    with open(result_path, encoding="utf8") as file:
+                        results.append(json.load(file))
+                else:
+                    error = process.stderr.decode("utf8", errors="replace").strip().splitlines() if process.stderr \
+                        else ["exit code %d" % process.returncode]
+                    results.append(dict(config, error=error[-1] if error else ""))
+            except subprocess.TimeoutExpired:
+                results.append(dict(config, error="timed out after %d s" % timeout))
+            finally:
+                os.remove(result_path)
+            print(format_row(results[-1]), flush=True)
+    return results
+
+
+# The columns of the results table: the key of the measurement, the header, the width and the format
+COLUMNS = (("engine", "engine", 7, "s"), ("mp_func", "mp_func", 13, "s"), ("threads", "threads", 7, "d"),
+           ("sleeptime", "sleep", 5, "g"), ("output", "output", 6, "s"), ("pages", "pages", 6, "d"),
+           ("failed", "failed", 6, "d"), ("seconds", "seconds", 8, ".2f"), ("pages_per_second", "pages/s", 8, ".1f"),
+           ("p50_ms", "p50 ms", 8, ".1f"), ("p99_ms", "p99 ms", 8, ".1f"), ("rss_mb", "RSS MB", 7, ".0f"),
+           ("rss_children_mb", "child MB", 8, ".0f"), ("queue_ms", "queue ms", 8, ".2f"),
+           ("overhead", "overhead", 8, ".1%"))
+
+
+def format_header():
+    """Returns the header of the results table."""
+    return " ".join(header.rjust(width) for _, header, width, _ in COLUMNS)
+
+
+def format_row(result):
+    """Formats the measurements of a run as a row of the results table."""
+    columns = COLUMNS[:5] if "error" in result else COLUMNS
+    row = " ".join((format(result[key], spec) if result.get(key) is not None else "-").rjust(width)
+                   for key, _, width, spec in columns)
+    return row + ("  ERROR: %s" % result["error"] if "error" in result else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the crawl engine against a synthetic job portal.")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4], help="numbers of threads (Driver clones)")
+    parser.add_argument("--sleeptime", type=float, nargs="+", default=[0], help="sleeptime values of Scraper.start")
+    parser.add_argument("--engine", nargs="+", default=["process", "thread"], choices=("process", "thread"))
+    parser.add_argument("--mp-func", nargs="+", default=["_follow_links"],
+                        help="scraping types; 'follow_dests' requires a browser and a matching scraping function")
+    parser.add_argument("--output", nargs="+", default=["memory", "csv.gz"], choices=OUTPUTS,
+                        help="results kept in memory, saved to a .csv or .csv.gz savefile, or only streamed")
+    parser.add_argument("--ads", type=int, default=500, help="number of job ads on the portal")
+    parser.add_argument("--per-page", type=int, default=20, help="number of ads on a listing page")
+    parser.add_argument("--slow-every", type=int, default=25, help="every n-th ad is slow (0 for none)")
+    parser.add_argument("--slow-delay", type=float, default=0.2, help="delay of the slow ads in seconds")
+    parser.add_argument("--fail-every", type=int, default=50, help="every n-th ad fails (0 for none)")
+    parser.add_argument("--repeat", type=int, default=1, help="number of runs of every combination")
+    parser.add_argument("--browser", action="store_true", help="load the pages in Firefox instead of plain HTTP")
+    parser.add_argument("--executable-path", default="", help="path to the geckodriver executable (with --browser)")
+    parser.add_argument("--bins-path", default="", help="path to the Firefox executable (with --browser)")
+    parser.add_argument("--json", default="", help="path to a JSON file the results are saved to")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the Scrapers")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    parser.add_argument("--address", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.single:
+        result = run_once(json.loads(args.single), args.address)
+        with open(args.result, "w", encoding="utf8") as file:
+            json.dump(result, file)
+        return
+    portal = Portal(args.ads, args.per_page, args.slow_every, args.slow_delay, args.fail_every)
+    process, address = start_portal(portal)
+    configs = [{"engine": engine, "mp_func": mp_func, "threads": threads, "sleeptime": sleeptime, "output": output,
+                "browser": args.browser, "executable_path": args.executable_path, "bins_path": args.bins_path}
+               for engine, mp_func, threads, sleeptime, output in product(args.engine, args.mp_func, args.threads,
+                                                                          args.sleeptime, args.output)]
+    print("Benchmarking %d configurations against %s (%d pages)\n" % (len(configs), address, portal.pages()))
+    print(format_header())
+    try:
+        results = run_benchmarks(configs, address, args.repeat, args.verbose)
+    finally:
+        process.terminate()
+    if args.json:
+        with open(args.json, "w", encoding="utf8") as file:
+            json.dump({"portal": vars(portal), "time": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}, file,
+                      indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from collections import deque  # Windows of recent page measurements
+import statistics  # Median page latency
+import time  # Module to work with time objects
+try:
+    import psutil  # CPU and memory usage of the machine (optional)
+except ImportError:
+    psutil = None
+
+
+class ConcurrencyController(object):
+    """
+    Decides how many workers (Driver clones) a Scraper should run while it scrapes. Every worker reports the latency,
+    the timed out attempts and the success of each page. A worker is added while the pages keep their latency, few
+    attempts time out or fail and the machine has CPU and memory to spare; a worker is removed as soon as any of these
+    gets worse. Hosts with a high rate of failed pages are slowed down in the politeness scheduler instead, so a single
+    struggling site does not lower the number of workers for all others.
+    """
+
+    def __init__(self, min_workers=1, max_workers=None, interval=10, window=50, target_latency=None,
+                 latency_factor=1.5, max_timeout_rate=0.1, max_error_rate=0.2, max_cpu=85, max_memory=85,
+                 host_backoff=2):
+        """
+        :param min_workers: the lowest number of workers.
+        :param max_workers: the highest number of workers. If left None, the number of threads of the Scraper is used;
+        if it's higher, additional Driver clones are made.
+        :param interval: the minimum number of seconds between two changes of the number of workers.
+        :param window: the number of most recent pages (overall and per host) the decisions are based on.
+        :param target_latency: the highest acceptable median time of a page in seconds. If left None, the lowest median
+        measured so far times 'latency_factor' is used.
+        :param latency_factor: the allowed growth of the median page time over the lowest one measured.
+        :param max_timeout_rate: the highest acceptable share of connection attempts that timed out.
+        :param max_error_rate: the highest acceptable share of failed pages, overall and per host.
+        :param max_cpu: the highest acceptable CPU usage of the machine in percent (only used if psutil is installed).
+        :param max_memory: the highest acceptable memory usage of the machine in percent (only used if psutil is
+        installed).
+        :param host_backoff: the factor the connection interval of a struggling host is multiplied with.
+        """
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max_workers
+        self.interval = interval
+        self.window = window
+        self.target_latency = target_latency
+        self.latency_factor = latency_factor
+        self.max_timeout_rate = max_timeout_rate
+        self.max_error_rate = max_error_rate
+        self.max_cpu = max_cpu
+        self.max_memory = max_memory
+        self.host_backoff = host_backoff
+        self.samples = deque(maxlen=window)
+        self.hosts = dict()
+        self.baseline = None
+        self.last_change = time.time()
+
+    def record(self, stats):
+        """
+        Records the measurements of scraped pages.
+        :param stats: a list of timing records, one for each page (see metrics.ScrapeMetrics); the keys 'host', 'total',
+        'retries' and 'failed' are used.
+        """
+        for page in stats:
+            self.samples.append((page["total"], page["retries"], page["failed"]))
+            self.hosts.setdefault(page["host"], deque(maxlen=self.window)).append(page["failed"])
+
+    def headroom(self):
+        """Returns True if the CPU and memory usage of the machine are below the limits (always True without psutil)."""
+        if psutil is None:
+            return True
+        return psutil.cpu_percent() < self.max_cpu and psutil.virtual_memory().percent < self.max_memory
+
+    def struggling_hosts(self):
+        """Returns the hosts whose share of failed pages is over the limit. Their measurements are started anew."""
+        hosts = []
+        for host, failed in self.hosts.items():
+            if len(failed) >= min(10, self.window) and sum(failed) / len(failed) > self.max_error_rate:
+                hosts.append(host)
+                failed.clear()
+        return hosts
+
+    def overloaded(self):
+        """Returns True if the measured pages (or the machine) show that there are too many workers."""
+        latencies = [seconds for seconds, _, failed in self.samples if not failed]
+        attempts = len(self.samples) + sum(timeouts for _, timeouts, _ in self.samples)
+        if sum(timeouts for _, timeouts, _ in self.samples) / attempts > self.max_timeout_rate:
+            return True
+        if sum(failed for _, _, failed in self.samples) / len(self.samples) > self.max_error_rate:
+            return True
+        if latencies:
+            latency = statistics.median(latencies)
+            self.baseline = latency if self.baseline is None else min(self.baseline, latency)
+            limit = self.target_latency if self.target_latency else self.baseline * self.latency_factor
+            if latency > limit:
+                return True
+        return not self.headroom()
+
+    def decide(self, workers, pending):
+        """
+        Decides on a change of the number of workers. Nothing is changed until 'interval' seconds have passed since the
+        last change and every worker scraped at least one page since then.
+        :param workers: the number of running workers.
+        :param pending: the number of items that are not finished yet.
+        :return: 1 if a worker should be added, -1 if a worker should be removed, otherwise 0.
+        """
+        if time.time() - self.last_change < self.interval or len(self.samples) < max(1, min(workers, self.window)):
+            return 0
+        change = 0
+        if self.overloaded():
+            change = -1 if workers > self.min_workers else 0
+        elif workers < self.max_workers and pending > workers:
+            change = 1
+        if change:
+            # The next decision is only based on the pages scraped with the new number of workers
+            self.samples.clear()
+            self.last_change = time.time()
+        return change
@@ -0,0 +1,349 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from multiprocessing import Queue, Value  # Queue and counters shared between processes
+from multiprocessing.managers import BaseManager, DictProxy, AcquirerProxy  # Serving shared objects over a socket
+from queue import Queue as ThreadQueue  # Queue shared between threads
+from link_index import SharedBloomFilter  # Shared index of already seen links
+from politeness import PolitenessScheduler  # Shared per-host rate limiting
+from link_queue import PriorityLinkQueue, LinkQueueManager  # Queue of links with priorities and fairness between hosts
+from retries import CircuitBreaker  # Shared per-host circuit breakers
+import threading  # Locks of the server's shared objects
+import csv  # Module to work .csv files
+
+
+class PendingCounter(object):
+    """
+    Counts the items which were put into the queue and are not finished yet (scraped or failed), and the workers that
+    consume the queue. A worker adds the new items before it puts them into the queue and releases its item only after
+    that, so the count can only reach zero once the queue is drained for good. The worker releasing the last item puts a
+    None (a sentinel) into the queue for every registered worker, which stops the workers at once.
+    """
+
+    def __init__(self, queue):
+        """
+        :param queue: the queue of items the counted items are put into.
+        """
+        self.queue = queue
+        self.pending = Value("q", 0)
+        self.workers = Value("i", 0)
+        self.closed = Value("b", 0)
+
+    def register(self, workers):
+        """
+        Registers a number of workers that consume the queue (a negative number unregisters them).
+        :return: False if the sentinels were already put into the queue (and no items were added since), else True.
+        """
+        with self.pending.get_lock():
+            self.workers.value += workers
+            return not self.closed.value
+
+    def retire(self):
+        """
+        Unregisters a worker that stops on its own while items are still pending (e.g. one removed by the adaptive
+        concurrency), so no sentinel is put into the queue for it.
+        :return: True if the worker was unregistered, False if its sentinel is already in the queue (the worker should
+        then stop on it instead).
+        """
+        with self.pending.get_lock():
+            if self.closed.value or self.workers.value < 1:
+                return False
+            self.workers.value -= 1
+            return True
+
+    def add(self, items):
+        """Counts a number of items that are about to be put into the queue."""
+        with self.pending.get_lock():
+            self.pending.value += items
+            if items > 0:
+                self.closed.value = 0
+
+    def release(self, items=1):
+        """
+        Marks a number of items as finished. If no item is pending any more, the sentinels are put into the queue.
+        :return: the number of pending items.
+        """
+        with self.pending.get_lock():
+            self.pending.value -= items
+            if self.pending.value > 0:
+                return self.pending.value
+            for _ in range(self.workers.value):
+                self.queue.put(None)
+            self.workers.value = 0
+            self.closed.value = 1
+            return 0
+
+    def count(self):
+        """Returns the number of pending items."""
+        return self.pending.value
+
+
+class LocalBackend(object):
+    """
+    The default backend of a Scraper: the queue of links, the politeness scheduler and the index of seen links live on
+    this machine, and the results are only returned by Scraper.start (and saved to its savefile).
+    """
+
+    def __init__(self):
+        self.engine = "process"
+        self.manager = None
+        self.queue_manager = None
+
+    def open(self, engine="process", manager=None):
+        """
+        Prepares the backend for a scraping process.
+        :param engine: the Scraper's engine, "process" or "thread".
+        :param manager: a started multiprocessing Manager, required with the "process" engine.
+        """
+        self.engine = engine
+        self.manager = manager
+
+    def queue(self, priority=False):
+        """
+        Returns the queue of items to scrape, shared by all workers.
+        :param priority: if True, a link_queue.PriorityLinkQueue is returned instead of a FIFO queue. With the "process"
+        engine it's served to the workers by its own manager process.
+        """
+        if priority and self.engine == "thread":
+            return PriorityLinkQueue()
+        if priority:
+            self.queue_manager = LinkQueueManager()
+            self.queue_manager.start()
+            return self.queue_manager.PriorityLinkQueue()
+        return ThreadQueue() if self.engine == "thread" else Queue()
+
+    def scheduler(self, interval=3, burst=1):
+        """Returns the politeness scheduler shared by all workers."""
+        if self.engine == "thread":
+            return PolitenessScheduler(dict(), threading.Lock(), interval, burst)
+        return PolitenessScheduler(self.manager.dict(), self.manager.Lock(), interval, burst)
+
+    def breaker(self, threshold=5, cooldown=30):
+        """Returns the circuit breakers of the hosts, shared by all workers (see retries.CircuitBreaker)."""
+        if self.engine == "thread":
+            return CircuitBreaker(dict(), threading.Lock(), threshold, cooldown)
+        return CircuitBreaker(self.manager.dict(), self.manager.Lock(), threshold, cooldown)
+
+    @staticmethod
+    def counter(queue):
+        """Returns the counter of pending items of the given queue (see PendingCounter)."""
+        return PendingCounter(queue)
+
+    @staticmethod
+    def seen_links(capacity=1000000):
+        """Returns the index of seen (normalized) links; its method 'add' returns True only for new links."""
+        return SharedBloomFilter(capacity)
+
+    def store(self, characteristics, following, failed):
+        """Stores a batch of results. The local backend keeps no results of its own."""
+        return
+
+    def close(self):
+        """Ends the scraping process on the backend."""
+        self.manager = None
+        if self.queue_manager is not None:
+            self.queue_manager.shutdown()
+            self.queue_manager = None
+
+
+class ResultStore(object):
+    """
+    The results of all Scrapers connected to a backend server. The characteristics are appended to the server's
+    savefile (if given), while the links to follow and the unsuccessful connections are kept in memory.
+    """
+
+    def __init__(self, to_save=""):
+        self.to_save = to_save
+        self.following = []
+        self.failed = []
+        self.rows = 0
+        self.lock = threading.Lock()
+
+    def store(self, characteristics, following, failed):
+        """Stores a batch of results of a Scraper."""
+        with self.lock:
+            if self.to_save and characteristics:
+                with open(self.to_save, "a+", encoding="utf8", newline="") as savefile:
+                    csv.writer(savefile, delimiter=";", quotechar="\"").writerows(characteristics)
+            self.rows += len(characteristics)
+            self.following.extend(following)
+            self.failed.extend(failed)
+
+    def get_following(self):
+        """Returns the links to follow collected from all Scrapers."""
+        with self.lock:
+            return list(self.following)
+
+    def get_failed(self):
+        """Returns the unsuccessful connections collected from all Scrapers."""
+        with self.lock:
+            return list(self.failed)
+
+    def count(self):
+        """Returns the number of stored rows of characteristics."""
+        return self.rows
+
+
+class LinkSet(object):
+    """A set of seen (normalized) links on the backend server, with the same 'add' method as SharedBloomFilter."""
+
+    def __init__(self):
+        self.links = set()
+        self.lock = threading.Lock()
+
+    def add(self, link):
+        """Records a link. Returns True if the link was not seen before, False otherwise."""
+        with self.lock:
+            if link in self.links:
+                return False
+            self.links.add(link)
+            return True
+
+    def count(self):
+        """Returns the number of seen links."""
+        return len(self.links)
+
+
+# The objects shared by the backend server; they only exist in the server's process
+_shared = dict()
+
+
+def _init_server(to_save="", priority=False):
+    """Creates the shared objects of a backend server."""
+    _shared.update({"queue": PriorityLinkQueue() if priority else ThreadQueue(), "buckets": dict(),
+                    "lock": threading.Lock(), "results": ResultStore(to_save), "seen": LinkSet(), "breakers": dict(),
+                    "breaker_lock": threading.Lock()})
+    _shared.update({"counter": PendingCounter(_shared["queue"])})
+
+
+def _get_queue():
+    return _shared["queue"]
+
+
+def _get_buckets():
+    return _shared["buckets"]
+
+
+def _get_lock():
+    return _shared["lock"]
+
+
+def _get_breakers():
+    return _shared["breakers"]
+
+
+def _get_breaker_lock():
+    return _shared["breaker_lock"]
+
+
+def _get_results():
+    return _shared["results"]
+
+
+def _get_seen():
+    return _shared["seen"]
+
+
+def _get_counter():
+    return _shared["counter"]
+
+
+class BackendManager(BaseManager):
+    """The manager serving (or connecting to) the shared objects of a backend server over a socket."""
+    pass
+
+
+BackendManager.register("queue", callable=_get_queue)
+BackendManager.register("buckets", callable=_get_buckets, proxytype=DictProxy)
+BackendManager.register("lock", callable=_get_lock, proxytype=AcquirerProxy)
+BackendManager.register("breakers", callable=_get_breakers, proxytype=DictProxy)
+BackendManager.register("breaker_lock", callable=_get_breaker_lock, proxytype=AcquirerProxy)
+BackendManager.register("results", callable=_get_results)
+BackendManager.register("seen", callable=_get_seen)
+BackendManager.register("counter", callable=_get_counter)
+
+
+def serve(address=("", 50000), authkey=b"", to_save="", priority=False):
+    """
+    Runs a backend server in this process until it's interrupted. Scrapers on any number of nodes can then connect to
+    it with a RemoteBackend.
+    :param address: the (host, port) pair the server listens on.
+    :param authkey: the authentication key (bytes) the Scrapers must use to connect.
+    :param to_save: path to the savefile of the server, where the characteristics of all Scrapers are appended.
+    :param priority: if True, the server's queue is a link_queue.PriorityLinkQueue, required by Scrapers started with
+    'priority', 'max_depth' or 'max_pages'.
+    """
+    _init_server(to_save, priority)
+    BackendManager(address=address, authkey=authkey).get_server().serve_forever()
+
+
+def start_server(address=("127.0.0.1", 0), authkey=b"", to_save="", priority=False):
+    """
+    Starts a backend server in a child process, e.g. a local stand-in for a server on another node.
+    :param address: the (host, port) pair the server listens on; port 0 selects a free port.
+    :param authkey: the authentication key (bytes) the Scrapers must use to connect.
+    :param to_save: path to the savefile of the server.
+    :param priority: if True, the server's queue is a link_queue.PriorityLinkQueue (see serve).
+    :return: the started BackendManager. Its attribute 'address' is the address to connect to; the server is stopped
+    with its method 'shutdown'.
+    """
+    manager = BackendManager(address=address, authkey=authkey)
+    manager.start(_init_server, (to_save, priority))
+    return manager
+
+
+class RemoteBackend(object):
+    """
+    A backend on a server (see serve), shared by Scrapers on several nodes: they consume the same queue of links, pace
+    the connections with the same politeness scheduler, skip the links seen by any of them and store the results in the
+    same place. The workers of all Scrapers stop together when the shared queue is drained. The Scrapers should be
+    started with the same function 'func' and type of scraping.
+    """
+
+    def __init__(self, address, authkey=b""):
+        """
+        Connects to a backend server.
+        :param address: the (host, port) pair of the server.
+        :param authkey: the authentication key (bytes) of the server.
+        """
+        self.address = address
+        self.manager = BackendManager(address=tuple(address), authkey=authkey)
+        self.manager.connect()
+        self.results = self.manager.results()
+
+    def open(self, engine="process", manager=None):
+        """Prepares the backend for a scraping process; the shared objects already live on the server."""
+        return
+
+    def queue(self, priority=False):
+        """
+        Returns (a proxy of) the server's queue of items to scrape.
+        :param priority: if True, the server's queue must be a priority queue (see serve).
+        """
+        queue = self.manager.queue()
+        if priority and not hasattr(queue, "admit"):
+            raise ValueError("The backend server at %s was not started with a priority queue!" % (self.address,))
+        return queue
+
+    def scheduler(self, interval=3, burst=1):
+        """Returns a politeness scheduler on the server's buckets, shared by the Scrapers on all nodes."""
+        return PolitenessScheduler(self.manager.buckets(), self.manager.lock(), interval, burst)
+
+    def breaker(self, threshold=5, cooldown=30):
+        """Returns circuit breakers on the server's states of the hosts, shared by the Scrapers on all nodes."""
+        return CircuitBreaker(self.manager.breakers(), self.manager.breaker_lock(), threshold, cooldown)
+
+    def counter(self, queue):
+        """Returns (a proxy of) the server's counter of pending items, shared by the workers on all nodes."""
+        return self.manager.counter()
+
+    def seen_links(self, capacity=1000000):
+        """Returns (a proxy of) the server's set of seen links."""
+        return self.manager.seen()
+
+    def store(self, characteristics, following, failed):
+        """Stores a batch of results on the server."""
+        self.results.store(characteristics, following, failed)
+
+    def close(self):
+        """Ends the scraping process on the backend; the server keeps running for other Scrapers."""
+        return
@@ -0,0 +1,85 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+import sqlite3  # On-disk database for the frontier
+import json  # Serialization of the frontier items
+import time  # Timestamps of the state changes
+
+PENDING = "pending"
+IN_FLIGHT = "in-flight"
+DONE = "done"
+FAILED = "failed"
+
+
+class Frontier(object):
+    """
+    An on-disk record of the crawl frontier, stored in a SQLite database. Every item (URL address or a 'follow_dests'
+    input duo) that is put into the Scraper's queue is recorded with its state: pending, in-flight, done or failed.
+    An interrupted crawl can be resumed from the pending and in-flight items.
+    """
+
+    def __init__(self, path):
+        """
+        Opens (or creates) the frontier database.
+        :param path: path to the frontier database file.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS frontier (item TEXT PRIMARY KEY, state TEXT NOT NULL, "
+                                "attempts INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL)")
+        self.connection.commit()
+
+    @staticmethod
+    def _dump(item):
+        """Serializes an item into its database key."""
+        return json.dumps(item, ensure_ascii=False)
+
+    @staticmethod
+    def _load(key):
+        """Deserializes a database key into an item. Lists are returned as tuples (the 'follow_dests' input duos)."""
+        item = json.loads(key)
+        return tuple(item) if isinstance(item, list) else item
+
+    def add(self, items):
+        """Records new pending items; already recorded items keep their state."""
+        now = time.time()
+        self.connection.executemany("INSERT OR IGNORE INTO frontier (item, state, updated) VALUES (?, ?, ?)",
+                                    [(self._dump(item), PENDING, now) for item in items])
+
+    def mark(self, items, state):
+        """Changes the state of the given items. Items taken by a worker also get their number of attempts increased."""
+        now = time.time()
+        self.connection.executemany("INSERT OR IGNORE INTO frontier (item, state, updated) VALUES (?, ?, ?)",
+                                    [(self._dump(item), state, now) for item in items])
+        self.connection.executemany("UPDATE frontier SET state = ?, updated = ?, attempts = attempts + ? "
+                                    "WHERE item = ?",
+                                    [(state, now, int(state == IN_FLIGHT), self._dump(item)) for item in items])
+
+    def unfinished(self):
+        """Returns a list of pending and in-flight items, in the order they were recorded."""
+        return self.items(PENDING, IN_FLIGHT)
+
+    def items(self, *states):
+        """Returns a list of items in any of the given states."""
+        cursor = self.connection.execute("SELECT item FROM frontier WHERE state IN (%s) ORDER BY rowid"
+                                         % ", ".join("?" * len(states)), states)
+        return [self._load(row[0]) for row in cursor]
+
+    def count(self, state):
+        """Returns the number of items in the given state."""
+        return self.connection.execute("SELECT COUNT(*) FROM frontier WHERE state = ?", (state,)).fetchone()[0]
+
+    def clear(self):
+        """Removes all records from the frontier."""
+        self.connection.execute("DELETE FROM frontier")
+        self.connection.commit()
+
+    def commit(self):
+        """Writes the recorded changes to the disk (a checkpoint)."""
+        self.connection.commit()
+
+    def close(self):
+        """Commits the changes and closes the database."""
+        self.connection.commit()
+        self.connection.close()
@@ -4,11 +4,19 @@ from bs4 import BeautifulSoup  # HTML navigation
 from selenium import webdriver  # Browser simulated scraping
 from selenium.webdriver.firefox.options import Options  # Options for the Firefox browser simulation
 from selenium.webdriver.firefox.firefox_binary import FirefoxBinary  # Initialization for the browser
-import sys  # Folder and file manipulation
-from datetime import datetime  # Date and time manipulation
 from urllib.parse import urlparse  # Parsing internet addresses
+from urllib.error import URLError  # Errors of plain HTTP connections
+import urllib3  # Pooled plain HTTP connections for static pages
+from link_index import normalize_link  # Normalized form of internet addresses
+from robots import parse_robots, fetch_robots, RobotsCache  # Robots file download, parsing and caching
+from scrape_logging import log  # Logfiles written through the logging module
+from fingerprints import page_fingerprint  # Fingerprints of unchanged pages
+from page_archive import PageArchive  # Recording and replaying of visited pages
 from warnings import warn  # Python warning mechanics
 import re  # Regular expressions
+import hashlib  # Hashing of page sources
+import time  # Timing of the stages of a connection
+from threading import Thread  # Concurrent start of browsers
 
 from selenium.common.exceptions import TimeoutException  # Timeout exception handling
 from selenium.common.exceptions import WebDriverException  # Unconnected internet sites' errors handling
@@ -24,11 +32,47 @@ import win_unicode_console
 win_unicode_console.enable()
 
 
+def compile_restrictions(restrictions, allowances=()):
+    """
+    Compiles robots rules into a single regular expression anchored at the start of the path. The wildcard '*' matches
+    any sequence of characters and a trailing '$' anchors the rule at the end of the path. The rules are ordered from the
+    longest to the shortest (allowances first on ties), so the first matching rule is the most specific one. Returns
+    the pattern and a list of (allowed, rule) couples in the order of the pattern's groups.
+    """
+    rules = sorted([(False, rule) for rule in restrictions] + [(True, rule) for rule in allowances],
+                   key=lambda x: (-len(x[1]), not x[0]))
+    if not rules:
+        return re.compile("(?!)"), rules
+    groups = []
+    for _, rule in rules:
+        end = rule.endswith("$")
+        groups.append("(%s%s)" % (re.escape(rule[:-1] if end else rule).replace("\\*", ".*"), "$" if end else ""))
+    return re.compile("^(?:%s)" % "|".join(groups)), rules
+
+
 class Driver(object):
     """Custom driver class, which opens and operates on a proxy Firefox browser."""
-    driver = None
+    _driver = None
+    _lazy_url = None
+    _webdriver_log = ""
+    _timeout = None
+    _pool = None
+    _archive = None
+    static = False
+    pages = 0
+    timeouts = 0
+    timings = dict()
+    recycle_after = 0
     current_url = None
-    soup = BeautifulSoup("", "lxml")
+    _soup = None
+    _page_source = ""
+    _source_hash = None
+    etag = None
+    last_modified = None
+    not_modified = False
+    failure = None
+    archive = ""
+    archive_mode = "record"
     http = ""
     domain = ""
     path = ""
@@ -38,10 +82,17 @@ class Driver(object):
     n = 15
     meta = dict()
     __fresh__ = True
+    allowances = []
+    crawl_delay = None
+    _robots_pattern = None
+    _robots_cache = dict()
 
     def __init__(self, executable_path, bins_path, options=None, restrictions=None, to_log="", proxy_port=None, profile=None,
-                 name="cstmdr", n=15, user_agent_string="custombot"):
+                 name="cstmdr", n=15, user_agent_string="custombot", robots_cache="", robots_expiry=86400, static=False,
+                 recycle_after=0, archive="", archive_mode="record"):
         """Initiate a Driver class object. """
+        if archive_mode not in ("record", "replay"):
+            raise ValueError("Parameter 'archive_mode' must be either 'record' or 'replay'!")
         self.name = name
         self.n = n
         self.user_agent_string = user_agent_string
@@ -54,6 +105,12 @@ class Driver(object):
         self.to_log = to_log if to_log else ""
         self.__change_restrictions__ = False if restrictions is not None else True
         self.restrictions = restrictions
+        self.robots_cache = robots_cache
+        self.robots_expiry = robots_expiry
+        self.static = static
+        self.recycle_after = recycle_after
+        self.archive = archive
+        self.archive_mode = archive_mode
         self.profile = profile
         if proxy_port is None:
             self.proxy_port = ("", 0) * 5
@@ -61,101 +118,321 @@ class Driver(object):
             self.proxy_port = proxy_port
         self.save_to_log("Opening new driver instance with the following options: %s" % self.options)
 
-    def save_to_log(self, message, nblank=0, **kwargs):
-        """Prints a message to the output screen and to the log if it is given"""
-        print(u"%s%s" % ("\n"*nblank, message))
+    def save_to_log(self, message, nblank=0, phase="", **kwargs):
+        """Prints a message to the output screen and to the log if it is given. The logged message is tagged with the
+        Driver's name, the current URL address and the phase of the scraping (see scrape_logging.log)."""
+        print(u"%s%s" % ("\n"*nblank, message), **kwargs)
         if self.to_log:
-            with open(self.to_log, "a", encoding="utf8") as logfile:
-                sys.stdout = logfile
-                print("%s%s:\t%s" % ("\n"*nblank, datetime.now().strftime("%d.%m.%Y %H:%M:%S"), message), **kwargs)
-                sys.stdout = sys.__stdout__
+            log(self.to_log, message, nblank, driver=self.name, url=self.current_url, phase=phase)
+
+    @property
+    def driver(self):
+        """
+        The Selenium webdriver running the browser. If the current page was fetched over plain HTTP (see get), the
+        browser is only started when this attribute is first used, and it is then connected to the current page.
+        """
+        if self._lazy_url is not None:
+            lazy_url, self._lazy_url = self._lazy_url, None
+            if self._driver is None or not self.is_alive():
+                self._start_browser(self._webdriver_log, self._timeout)
+            self._driver.get(lazy_url)
+        return self._driver
+
+    @driver.setter
+    def driver(self, value):
+        self._lazy_url = None
+        self._driver = value
+
+    @driver.deleter
+    def driver(self):
+        self._lazy_url = None
+        self._driver = None
+
+    @property
+    def session(self):
+        """The id of the running browser session, None if no browser was started."""
+        return self._driver.session_id if self._driver is not None else None
+
+    def __getstate__(self):
+        """A running browser and the HTTP connections can't be copied to another process; the copy starts its own."""
+        state = self.__dict__.copy()
+        state.update({"_driver": None, "_pool": None, "_archive": None})
+        return state
+
+    @property
+    def soup(self):
+        """
+        The HTML code (soup) of the current page. It is parsed from the page source at first use, so pages which are
+        only worked on with the browser are never parsed.
+        """
+        if self._soup is None:
+            started = time.time()
+            self._soup = BeautifulSoup(self._page_source, "lxml")
+            self._add_timing("parse", started)
+        return self._soup
+
+    @soup.setter
+    def soup(self, value):
+        self._soup = value
+
+    def _set_source(self, page_source):
+        """
+        Stores a new page source and discards the old soup. Returns True if the content differs from the previous page
+        source, which is checked by comparing their hashes.
+        """
+        data = page_source if isinstance(page_source, bytes) else page_source.encode("utf8", errors="replace")
+        source_hash = hashlib.md5(data).hexdigest()
+        self.timings = dict(self.timings, bytes=len(data))
+        changed = source_hash != self._source_hash
+        self._page_source, self._source_hash, self._soup = page_source, source_hash, None
+        return changed
+
+    def _add_timing(self, stage, started):
+        """Adds the time passed since 'started' to a stage of the current connection (see Driver.timings)."""
+        self.timings = dict(self.timings, **{stage: self.timings.get(stage, 0) + time.time() - started})
+
+    def _start_browser(self, webdriver_log="", timeout=None):
+        """Opens a new Firefox browser with the Driver's options, profile and proxy settings."""
+        started = time.time()
+        webdriver_log = webdriver_log if webdriver_log else None
+        options = Options()
+        for option in self.options:
+            options.add_argument(option)
+        profile = webdriver.FirefoxProfile()
+        if self.profile is None:
+            profile.set_preference("general.useragent.override", self.user_agent_string)
+        else:
+            for k, v in self.profile.items():
+                profile.set_preference(k, v)
+        if not self.proxy_port:
+            profile.set_preference("network.proxy.type", 5)
+        elif not all(self.proxy_port):
+            profile.set_preference("network.proxy.type", 0)
+        else:
+            profile.set_preference("network.proxy.type", 1)
+            profile.set_preference("network.proxy.http", self.proxy_port[0])
+            profile.set_preference("network.proxy.http_port", self.proxy_port[1])
+            profile.set_preference("network.proxy.https", self.proxy_port[2])
+            profile.set_preference("network.proxy.https_port", self.proxy_port[3])
+            profile.set_preference("network.proxy.ssl", self.proxy_port[4])
+            profile.set_preference("network.proxy.ssl_port", self.proxy_port[5])
+            profile.set_preference("network.proxy.ftp", self.proxy_port[6])
+            profile.set_preference("network.proxy.ftp_port", self.proxy_port[7])
+            profile.set_preference("network.proxy.socks", self.proxy_port[8])
+            profile.set_preference("network.proxy.socks_port", self.proxy_port[9])
+        profile.set_preference("javascript.enabled", True)
+        profile.update_preferences()
+        self.save_to_log("New Firefox instance opening...", phase="launch")
+        try:
+            self._driver = webdriver.Firefox(executable_path=self.executable_path, options=options,
+                                             firefox_binary=FirefoxBinary(self.bins_path), firefox_profile=profile,
+                                             service_log_path=webdriver_log)
+        except Exception as e:
+            # The reason tells the Scraper's supervisor that the browser could not start (see Scraper._aggregate)
+            self.failure = "launch error: %s" % type(e).__name__
+            raise
+        self._driver.set_page_load_timeout(20 if timeout is None else timeout)
+        self.pages = 0
+        self._add_timing("launch", started)
+
+    def is_static(self, link):
+        """Returns True if the link should be fetched over plain HTTP instead of the browser (see the static parameter)."""
+        if isinstance(self.static, bool):
+            return self.static
+        return any(re.search(pattern, link) for pattern in self.static)
+
+    def _http_pool(self):
+        """Returns the Driver's pool of plain HTTP connections, which is created at first use."""
+        if self._pool is None:
+            if self.proxy_port and all(self.proxy_port):
+                self._pool = urllib3.ProxyManager("http://%s:%s" % (self.proxy_port[0], self.proxy_port[1]))
+            else:
+                self._pool = urllib3.PoolManager()
+        return self._pool
+
+    def _page_archive(self):
+        """Returns the Driver's connection to its page archive, which is opened at first use."""
+        if self._archive is None:
+            self._archive = PageArchive(self.archive)
+        return self._archive
+
+    def _replay(self, link):
+        """Loads the page of the link from the page archive. Returns False if the link was not recorded."""
+        started = time.time()
+        self.http, self.domain, self.path, self.params, self.query, self.fragment = urlparse(link)[:]
+        self.current_url = link
+        page = self._page_archive().replay(link)
+        self._add_timing("navigation", started)
+        if page is None:
+            self.save_to_log("Link %s is not recorded in the page archive %s" % (link, self.archive), phase="connect")
+            self.failure = "not archived"
+            return False
+        self.etag, self.last_modified = page["headers"].get("etag"), page["headers"].get("last_modified")
+        # The browser is only started (and the live page loaded) if Driver.driver is used
+        self._lazy_url = link
+        self._set_source(page["page_source"])
+        return True
+
+    def _record(self, link, page_source, final_url=None):
+        """Saves the loaded page into the page archive."""
+        self._page_archive().record(link, page_source, final_url, {"etag": self.etag,
+                                                                   "last_modified": self.last_modified})
+
+    def _static_get(self, link, n, timeout, th, validators=None):
+        """
+        Fetches the link over plain HTTP and returns the page source (as bytes if the server did not declare a charset),
+        or None if the link could not be reached (the reason is set in Driver.failure). With validators (see Driver.get)
+        the request is conditional; if the server replies that the page is not modified, an empty page source is
+        returned and Driver.not_modified is set.
+        """
+        headers = {"User-Agent": self.user_agent_string}
+        if validators and validators.get("etag"):
+            headers["If-None-Match"] = validators.get("etag")
+        if validators and validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators.get("last_modified")
+        k = 0
+        while k < (self.n if n is None else n):
+            try:
+                response = self._http_pool().request("GET", link, headers=headers, timeout=timeout,
+                                                     retries=urllib3.Retry(connect=0, read=0, redirect=10))
+            except urllib3.exceptions.HTTPError as e:
+                if not isinstance(getattr(e, "reason", e), urllib3.exceptions.TimeoutError):
+                    self.save_to_log("Link %s could not be reached due to error %s" % (link, e), phase="connect")
+                    self.failure = "connection error: %s" % type(getattr(e, "reason", e)).__name__
+                    return None
+                if th:
+                    indx = str(k + 1) + " on driver %s" % th
+                else:
+                    indx = str(k + 1)
+                self.save_to_log("(%s) Timeout on link %s, retrying" % (indx, link), phase="connect")
+                self.timeouts += 1
+                k += 1
+                continue
+            if response.status >= 400:
+                self.save_to_log("Link %s could not be reached due to HTTP status %d" % (link, response.status),
+                                 phase="connect")
+                self.failure = "HTTP status %d" % response.status
+                return None
+            self.etag = response.headers.get("ETag")
+            self.last_modified = response.headers.get("Last-Modified")
+            if response.status == 304:
+                self.not_modified = True
+                return ""
+            charset = re.search("charset=([\\w-]+)", response.headers.get("Content-Type", ""))
+            # Without a declared charset the bytes are returned, so BeautifulSoup detects the encoding from the page
+            return response.data.decode(charset.group(1), errors="replace") if charset else response.data
+        self.save_to_log("Link %s could not be reached due to too many tries (%d)!" % (link, self.n if n is None else n))
+        self.failure = "timeout"
+        return None
 
-    def get(self, link=None, n=None, webdriver_log="", timeout=None, th=""):
+    def get(self, link=None, n=None, webdriver_log="", timeout=None, th="", static=None, validators=None, partial=True):
         """Connects to a internet link with a Firefox webdriver proxy browser.
-         If such a proxy does not yet exist, it creates one"""
+         If such a proxy does not yet exist, it creates one. If the link is static (see is_static), it is fetched over
+         plain HTTP instead and the browser is only started if Driver.driver is used. The 'validators' of an earlier
+         fetch of a static link (a dictionary with its 'etag' and 'last_modified') make the request conditional.
+         With a page archive in 'replay' mode the page is loaded from the archive instead, while in 'record' mode every
+         loaded page is saved into it. If the page could not be loaded, False is returned and the reason is set in
+         Driver.failure (e.g. "timeout", "HTTP status 503" or "robots denied"). If all 'n' attempts in the browser time
+         out, the partly loaded page is used, unless 'partial' is False: the page then counts as failed with a timeout,
+         e.g. so the Scraper retries it later."""
         self.__fresh__ = False
-        soup = self.soup
-        timeout = 20 if timeout is None else timeout
-        if self.driver is None or not self.is_alive():
-            webdriver_log = webdriver_log if webdriver_log else None
-            options = Options()
-            for option in self.options:
-                options.add_argument(option)
-            profile = webdriver.FirefoxProfile()
-            if self.profile is None:
-                profile.set_preference("general.useragent.override", self.user_agent_string)
-            else:
-                for k, v in self.profile.items():
-                    profile.set_preference(k, v)
-            if not self.proxy_port:
-                profile.set_preference("network.proxy.type", 5)
-            elif not all(self.proxy_port):
-                profile.set_preference("network.proxy.type", 0)
-            else:
-                profile.set_preference("network.proxy.type", 1)
-                profile.set_preference("network.proxy.http", self.proxy_port[0])
-                profile.set_preference("network.proxy.http_port", self.proxy_port[1])
-                profile.set_preference("network.proxy.https", self.proxy_port[2])
-                profile.set_preference("network.proxy.https_port", self.proxy_port[3])
-                profile.set_preference("network.proxy.ssl", self.proxy_port[4])
-                profile.set_preference("network.proxy.ssl_port", self.proxy_port[5])
-                profile.set_preference("network.proxy.ftp", self.proxy_port[6])
-                profile.set_preference("network.proxy.ftp_port", self.proxy_port[7])
-                profile.set_preference("network.proxy.socks", self.proxy_port[8])
-                profile.set_preference("network.proxy.socks_port", self.proxy_port[9])
-            profile.set_preference("javascript.enabled", True)
-            profile.update_preferences()
-            self.save_to_log("New Firefox instance opening...")
-            self.driver = webdriver.Firefox(executable_path=self.executable_path, options=options,
-                                            firefox_binary=FirefoxBinary(self.bins_path), firefox_profile=profile,
-                                            service_log_path=webdriver_log)
-        self.driver.set_page_load_timeout(timeout)
+        self.timings = dict()
+        self.etag, self.last_modified, self.not_modified, self.failure = None, None, False, None
         link = "about:blank" if link is None else link
+        if self.archive and self.archive_mode == "replay" and link != "about:blank":
+            return self._replay(link)
+        timeout = 20 if timeout is None else timeout
+        static = self.is_static(link) if static is None else static
+        self._webdriver_log, self._timeout = webdriver_log, timeout
+        if not static:
+            self._lazy_url = None
+            if self.recycle_after and self.pages >= self.recycle_after and self._driver is not None:
+                self.save_to_log("Driver %s: recycling the browser after %d pages" % (self.name, self.pages))
+                self.quit()
+            if self._driver is None or not self.is_alive():
+                self._start_browser(webdriver_log, timeout)
+            self._driver.set_page_load_timeout(timeout)
         if urlparse(link).netloc != self.domain and self.__change_restrictions__:
             self.restrictions = None
         self.http, self.domain, self.path, self.params, self.query, self.fragment = urlparse(link)[:]
         self.current_url = link
         if link != "about:blank" and self.restrictions is None:
             self.check_robots(n=2, **{".call": True})
-        if self.robots_deny(link=link):
-            self.save_to_log("Driver %s: Robots deny access to this page (condition \'%s\')!"
-                             % (self.name, self.robots_deny()))
-            warn("Robots deny access to page(condition \'%s\', page \'%s\')!" % (self.robots_deny(), self.current_url))
+        denied = self.robots_deny(link=link)
+        if denied:
+            self.save_to_log("Driver %s: Robots deny access to this page (condition \'%s\')!" % (self.name, denied),
+                             phase="robots")
+            warn("Robots deny access to page(condition \'%s\', page \'%s\')!" % (denied, self.current_url))
+            self.failure = "robots denied"
             return False
+        started = time.time()
+        if static:
+            page_source = self._static_get(link, n, timeout, th, validators)
+            self._add_timing("navigation", started)
+            if page_source is None:
+                return False
+            self._lazy_url = link
+            if self.archive and not self.not_modified:
+                self._record(link, page_source)
+            return self._set_source(page_source) or self.not_modified
         k = 0
         refresh = False
         while k < (self.n if n is None else n):
             try:
-                if link == self.driver.current_url:
-                    self.driver.refresh()
+                if link == self._driver.current_url:
+                    self._driver.refresh()
                     refresh = True
                 else:
-                    self.driver.get(link)
+                    self._driver.get(link)
+                self.pages += 1
                 break
             except TimeoutException:
                 if th:
                     indx = str(k + 1) + " on driver %s" % th
                 else:
                     indx = str(k + 1)
-                self.save_to_log("(%s) TimeoutException on link %s, retrying" % (indx, link))
+                self.save_to_log("(%s) TimeoutException on link %s, retrying" % (indx, link), phase="connect")
+                self.timeouts += 1
                 k += 1
             except WebDriverException as e:
-                self.save_to_log("Link %s could not be reached due to error %s" % (link, e))
+                self.save_to_log("Link %s could not be reached due to error %s" % (link, e), phase="connect")
+                self.failure = "browser error: %s" % type(e).__name__
                 return False
         else:
+            if not partial:
+                self.save_to_log("Link %s could not be reached due to too many tries (%d)!"
+                                 % (link, self.n if n is None else n), phase="connect")
+                self._driver.execute_script("window.stop();")
+                self._add_timing("navigation", started)
+                self.failure = "timeout"
+                return False
             self.save_to_log("Link %s may not have been reached due to too many tries (%d)!"
                              % (link, self.n if n is None else n))
-            self.driver.implicitly_wait(20)
-            self.driver.execute_script("window.stop();")
-        if refresh or BeautifulSoup(self.driver.page_source, "lxml") != soup:
-            self.soup = BeautifulSoup(self.driver.page_source, "lxml")
-            return True
-        else:
-            return False
+            self._driver.implicitly_wait(20)
+            self._driver.execute_script("window.stop();")
+        self._add_timing("navigation", started)
+        started = time.time()
+        page_source = self._driver.page_source
+        self._add_timing("transfer", started)
+        if self.archive and link != "about:blank":
+            self._record(link, page_source, self._driver.current_url)
+        return self._set_source(page_source) or refresh
+
+    def fingerprint(self):
+        """Returns the fingerprint of the current page source (see fingerprints.page_fingerprint)."""
+        return page_fingerprint(self._page_source)
 
     def resoup(self):
-        """Reloads the Driver's soup attribute"""
-        self.soup = BeautifulSoup(self.driver.page_source, "lxml")
+        """Reloads the Driver's soup attribute. A page fetched over plain HTTP keeps its soup until the browser is used."""
+        if self._lazy_url is None:
+            self._set_source(self.driver.page_source)
+
+    def quit(self):
+        """Closes the browser, if it was started."""
+        self._lazy_url = None
+        if self._driver is not None:
+            self._driver.quit()
+        self._driver = None
 
     def complete_link(self, link=""):
         """Completes given link with the protocol and netloc prefix. Works only for HTTP and HTTPS protocols."""
@@ -169,125 +446,89 @@ class Driver(object):
             link = "://".join([self.http, self.domain]) + "/" + link
         return link
 
+    def normalize_link(self, link=""):
+        """Completes given link (see complete_link) and returns its normalized form, used to detect duplicate links."""
+        return normalize_link(self.complete_link(link))
+
     def is_alive(self):
         """Check if the drivr object is alive or not."""
         if self.__fresh__:
             return True
         try:
-            self.driver.execute(Command.STATUS)
+            self._driver.execute(Command.STATUS)
             return True
         except (socket.error, http.client.CannotSendRequest, MaxRetryError, TypeError, AttributeError):
             return False
 
     def check_robots(self, agent="*", **kwargs):
-        """Checks robots on the domain."""
+        """Checks robots on the domain. The robots file is downloaded over plain HTTP, without the browser."""
         agents = [agent]
         if agent != self.user_agent_string:
             agents.append(self.user_agent_string)
-        self.save_to_log("Checking robots on domain %s" % self.domain)
-        currurl = self.current_url
         self.__change_restrictions__ = True
-        self.restrictions = []
-        restrictions = []
-        start_driver = False
-        th = 2 if kwargs.get("th") is None else kwargs.get("th")
-        if self.driver is None or not self.is_alive():
-            start_driver = True
-        self.get(self.complete_link("Robots.txt"), n=kwargs.get("n"), webdriver_log=kwargs.get("webdriver_log"),
-                 timeout=kwargs.get("timeout"), th=th)
-        bs1 = self.soup
-        self.get(self.complete_link("robots.txt"), n=kwargs.get("n"), webdriver_log=kwargs.get("webdriver_log"),
-                 timeout=kwargs.get("timeout"), th=th)
-        bs2 = self.soup
-        if start_driver:
-            self.driver.quit()
-        for _agent in agents:
-            if "User-agent: %s" % _agent in bs1.get_text().replace("User-Agent", "User-agent"):
-                cont = bs1.get_text().replace("User-Agent", "User-agent")
-            elif "User-agent: %s" % _agent in bs2.get_text().replace("User-Agent", "User-agent"):
-                cont = bs2.get_text().replace("User-Agent", "User-agent")
-            else:
-                self.restrictions = restrictions
-                self.save_to_log("No restrictions found for agent %s. Robots assumed from parent Driver!" % _agent)
-                if kwargs.get(".call") is None:
-                    self.get(currurl)
-                self.http, self.domain, self.path, self.params, self.query, self.fragment = urlparse(currurl)[:]
-                self.current_url = currurl
-                continue
-            count2 = 0
-            for __ in range(cont.count("User-agent: %s" % _agent) - 1):
-                count1 = cont.index("User-agent: %s" % _agent, count2)
-                count2 = cont.index("User-agent: ", count1 + 1)
-                if "Disallow: " in cont[count1:count2]:
-                    ccount2 = 0
-                    for _ in range(cont[count1:count2].count("Disallow: ") - 1):
-                        ccount1 = cont[count1:count2].index("Disallow: ", ccount2)
-                        ccount2 = min(cont[count1:count2].index("\n", ccount1 + 1),
-                                      cont[count1:count2].index("#", ccount1 + 1) if "#" in cont[
-                                                                                            count1 + ccount1 + 1:count2]
-                                      else 9999999999)
-                        restrictions.append(cont[(count1 + ccount1 + 10):(count1 + ccount2)])
-                    ccount1 = cont[count1:].index("Disallow: ", count1 + ccount2)
-                    restrictions.append(cont[(count1 + ccount1 + 10):(count1 + ccount1 + 10 +
-                                                                      min(cont[count1 + ccount1 + 10:].index("\n"),
-                                                                          cont[count1 + ccount1 + 10:count2].index("#")
-                                                                          if "#" in cont[count1 + ccount1 + 10:count2]
-                                                                          else 9999999999))])
-            count1 = cont.index("User-agent: %s" % _agent, count2)
+        cache = RobotsCache(self.robots_cache, self.robots_expiry) if self.robots_cache else None
+        rules = cache.get(self.domain) if cache is not None else None
+        if rules is None:
+            self.save_to_log("Checking robots on domain %s" % self.domain)
             try:
-                count2 = cont.index("User-agent: ", count1 + 1)
-            except ValueError:
-                count2 = len(cont)
-            if "Disallow: " in cont[count1:count2]:
-                ccount2 = 0
-                for _ in range(cont[count1:count2].count("Disallow: ") - 1):
-                    ccount1 = cont[count1:count2].index("Disallow: ", ccount2)
-                    ccount2 = min(cont[count1:count2].index("\n", ccount1 + 1),
-                                  cont[count1:count2].index("#", ccount1 + 1) if "#" in cont[
-                                                                                        count1 + ccount1 + 1:count2]
-                                  else 9999999999)
-                    restrictions.append(cont[(count1 + ccount1 + 10):(count1 + ccount2)])
-                ccount1 = cont[count1:].index("Disallow: ", ccount2)
-                try:
-                    restrictions.append(cont[(count1 + ccount1 + 10):(count1 + ccount1 + 10 +
-                                                                      min(cont[count1 + ccount1 + 10:].index("\n"),
-                                                                          cont[count1 + ccount1 + 10:count2].index("#")
-                                                                          if "#" in cont[count1 + ccount1 + 10:count2]
-                                                                          else 9999999999))])
-                except ValueError:
-                    restrictions.append(cont[(count1 + ccount1 + 10):])
-        self.restrictions = restrictions
+                content = fetch_robots("://".join([self.http, self.domain]), self.user_agent_string,
+                                       timeout=20 if kwargs.get("timeout") is None else kwargs.get("timeout"),
+                                       tries=2 if kwargs.get("n") is None else kwargs.get("n"))
+            except (URLError, socket.error) as e:
+                self.save_to_log("Robots file on domain %s could not be reached due to error %s" % (self.domain, e))
+                content = ""
+            rules = parse_robots(content, agents)
+            if cache is not None:
+                cache.set(self.domain, *rules)
+        self.restrictions, self.allowances, self.crawl_delay = rules
+        if not self.restrictions:
+            self.save_to_log("No restrictions found for agents %s." % agents)
+        self.robots_pattern()
         self.save_to_log("Robots checked! Restrictions: %s" % self.restrictions)
-        if kwargs.get(".call") is None:
-            self.get(currurl)
-        self.http, self.domain, self.path, self.params, self.query, self.fragment = urlparse(currurl)[:]
-        self.current_url = currurl
 
     def robots_deny(self, link=None):
-        """Returns list of websites that are denied by robots.txt file."""
-        rep = ((":", "\\:"), ("?", "\\?"), ("-", "\\-"), ("+", "\\+"), ("$", "\\$"), (".", "\\."),
-               ("\'", "\\\'"), ("[", "\\["), ("]", "\\]"), ("(", "\\("), (")", "\\)"), ("*", "\\*"))
-        link = self.driver.current_url if link is None else link
-        # Check middle of link (must include a "/" at the end of restriction)
-        for restriction in self.restrictions:
-            restriction_t = restriction
-            for r, p in rep:
-                restriction_t = restriction_t.replace(r, p).replace("\\*", ".*")
-            if re.search("^" + restriction_t, "".join(urlparse(link)[2:])) is not None:
-                return restriction
-        return False
+        """Returns the restriction (from the robots.txt file) that denies access to the page, otherwise False."""
+        if link is None:
+            link = self.current_url if self._lazy_url is not None else self._driver.current_url
+        parts = urlparse(link)
+        pattern, rules = self.robots_pattern()
+        match = pattern.match((parts.path or "/") + (";" + parts.params if parts.params else "") +
+                              ("?" + parts.query if parts.query else ""))
+        if match is None or rules[match.lastindex - 1][0]:
+            return False
+        return rules[match.lastindex - 1][1]
+
+    def robots_pattern(self):
+        """
+        Returns the robots rules compiled into a single regular expression and the list of rules of its groups. The
+        compiled pattern is cached per domain and shared with the clones of the Driver, so it is only rebuilt when the
+        rules change.
+        """
+        key = (tuple(self.restrictions), tuple(self.allowances))
+        if self._robots_pattern is None or self._robots_pattern[0] != key:
+            cached = Driver._robots_cache.get(self.domain)
+            if cached is None or cached[0] != key:
+                cached = (key, compile_restrictions(*key))
+                Driver._robots_cache[self.domain] = cached
+            self._robots_pattern = cached
+        return self._robots_pattern[1]
 
     def export_Driver(self):
         """Creates a clone of the Driver object with a non-active webdriver. Other attributes remain the same."""
         new = Driver(options=self.options, restrictions=self.restrictions, to_log=self.to_log,
                      proxy_port=self.proxy_port, profile=self.profile, executable_path=self.executable_path,
-                     bins_path=self.bins_path)
+                     bins_path=self.bins_path, user_agent_string=self.user_agent_string,
+                     robots_cache=self.robots_cache, robots_expiry=self.robots_expiry, static=self.static,
+                     recycle_after=self.recycle_after, archive=self.archive, archive_mode=self.archive_mode)
         new.name = self.name
         new.n = self.n
         new.current_url = self.current_url
         new.http = self.http
         new.domain = self.domain
         new.meta = self.meta
+        new.allowances = self.allowances
+        new.crawl_delay = self.crawl_delay
+        new._robots_pattern = self._robots_pattern
         new.driver = None
         return new
 
@@ -311,3 +552,63 @@ class Driver(object):
             self.meta.update(dict([keywords[c], values[c]] for c in range(len(keywords))))
         else:
             raise IndexError("Number of keywords and values does not match")
+
+
+class BrowserPool(object):
+    """
+    Keeps the browsers of a list of Driver objects running between scraping processes, so that they are only started
+    once. Before every use the browsers are health-checked and the dead ones (or the ones that reached the Driver's
+    'recycle_after' number of pages) are started again.
+    """
+
+    def __init__(self, drivers, size=None, webdriver_log="", timeout=None):
+        """
+        :param drivers: the list of Driver objects whose browsers are kept running.
+        :param size: the number of browsers to keep running, at most the number of Drivers. Defaults to all Drivers.
+        :param webdriver_log: the path of the webdriver's log (see Driver.get).
+        :param timeout: the page load timeout of the browsers.
+        """
+        self.drivers = drivers
+        self.size = len(drivers) if size is None else min(size, len(drivers))
+        self.webdriver_log = webdriver_log
+        self.timeout = timeout
+
+    def warm(self, size=None):
+        """
+        Health-checks the browsers of the first 'size' Drivers (defaults to the pool size) and starts the missing ones.
+        The browsers are started concurrently.
+        :return: the number of started browsers.
+        """
+        size = self.size if size is None else min(size, self.size)
+        cold = [dr for dr in self.drivers[:size] if dr.session is None or not dr.is_alive() or
+                (dr.recycle_after and dr.pages >= dr.recycle_after)]
+        threads = [Thread(target=self._restart, args=(dr,)) for dr in cold]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for dr in self.drivers[:size]:
+            # A used Driver is not closed at the end of a scraping process, so its browser stays in the pool
+            dr.__fresh__ = False
+        return len(cold)
+
+    def _restart(self, driver):
+        """Closes the (dead) browser of a Driver and starts a new one."""
+        try:
+            driver.quit()
+        except (WebDriverException, socket.error, MaxRetryError):
+            pass
+        driver._start_browser(self.webdriver_log, self.timeout)
+
+    def record(self, pages):
+        """Adds the numbers of pages scraped in a scraping process to the Drivers' counters (in order of Drivers)."""
+        for dr, n in zip(self.drivers, pages):
+            dr.pages += n
+
+    def close(self):
+        """Closes all browsers of the pool."""
+        for dr in self.drivers[:self.size]:
+            try:
+                dr.quit()
+            except (WebDriverException, socket.error, MaxRetryError):
+                pass
@@ -1,12 +1,26 @@
-from custom_driver import Driver  # Custom object that creates a storage holder for connections and info to domains
+from custom_driver import Driver, BrowserPool  # Custom object that creates a storage holder for connections and info to domains
+from crawl_frontier import Frontier, IN_FLIGHT, DONE, FAILED  # On-disk crawl frontier for resumable crawls
+from crawl_backend import LocalBackend  # Default backend of the queue and the results
+from concurrency import ConcurrencyController  # Adaptive number of workers
+from metrics import ScrapeMetrics  # Timing records and counters of the scraping process
+from scrape_logging import log, log_writer, attach_queue  # Logfiles written by a single writer
+from result_schema import Schema, open_savefile  # Typed records and the formats of the savefile
+from fingerprints import FingerprintStore  # Fingerprints of pages from earlier scraping processes
+from link_queue import child_links  # Depths of the links to follow
+from retries import RetryScheduler, Failure, is_transient  # Delayed retries of failed items
+from itertools import islice  # Reading the links in chunks
 import traceback  # Working with error tracebacks
-import csv  # Module to work .csv files
+import math  # Infinite pause of a host that is down
+import copy  # Copy of a Driver for the producer of links
 import time  # Module to work with time objects
-from datetime import datetime  # Module to work with datetime objects; including mathematical operations
 import os  # Module with tools for working with files and folders
-import sys  # Module with additional system tools
-from multiprocessing import Queue, Process, Manager  # Module for multi-thread work
+from urllib.parse import urlparse  # Parsing internet addresses
+from multiprocessing import Process, Manager, Pipe, Value, Event, get_start_method  # Module for multi-thread work
+from multiprocessing.connection import wait  # Waiting on multiple worker connections at once
 from multiprocessing.queues import Empty  # Multi-thread queue functionality
+from queue import Queue as ThreadQueue, Empty as ThreadEmpty  # In-process queue of results for the thread engine
+from contextlib import nullcontext  # Placeholder for the Manager in the thread engine
+import threading  # Workers on threads of a single process
 from selenium.common.exceptions import WebDriverException  # Module with WebDriver exception rules
 
 # Win10 fix for printing into a custom stdout (e.g. logfile)
@@ -14,6 +28,334 @@ import win_unicode_console
 win_unicode_console.enable()
 
 
+class _ResultPipe(object):
+    """
+    A worker's end of its own result pipe. Results are collected into batches and sent to the aggregator in the parent
+    process once 'batch_size' pages were scraped, so that the workers never touch shared (Manager) lists. The pipe also
+    shows the supervisor whether the worker holds an item it did not finish yet (1 from taking it from the queue, 2 once
+    the aggregator was notified), and carries the supervisor's request to stop the worker (e.g. when the adaptive
+    concurrency removes it).
+    """
+
+    def __init__(self, connection, batch_size=None, holding=None, stop=None):
+        self.connection = connection
+        self.batch_size = batch_size if batch_size else 10
+        self.batch = self._new_batch()
+        self.pages = 0
+        self.holding = Value("b", 0, lock=False) if holding is None else holding
+        self.stop = stop
+        self.item = None
+        self.closed = False
+
+    @staticmethod
+    def _new_batch():
+        return {"characteristics": [], "columns": dict(), "following": [], "failed": [], "done": [], "queued": [],
+                "stats": [], "fingerprints": [], "unchanged": []}
+
+    def retiring(self, pending):
+        """
+        Returns True if the supervisor asked the worker to stop before it takes its next item; the worker is then
+        unregistered from the counter of pending items. If the sentinels were already put into the queue, the worker
+        stops on its sentinel instead.
+        """
+        return self.stop is not None and self.stop.is_set() and pending.retire()
+
+    def hold(self, item):
+        """Records the item the worker just took from the queue, until it's finished or handed back."""
+        self.item = item
+        self.holding.value = 1
+
+    def _drop(self):
+        self.item = None
+        self.holding.value = 0
+
+    def taken(self, item):
+        """Immediately notifies the aggregator that the worker started scraping its item."""
+        self.connection.send({"taken": [item]})
+        self.holding.value = 2
+
+    def put_back(self, queue, item):
+        """Puts the worker's item back into the queue for any worker to take."""
+        queue.put(item)
+        self._drop()
+
+    def release(self, pending):
+        """Marks the worker's item as finished in the counter of pending items."""
+        pending.release()
+        self._drop()
+
+    def retry(self, item, host, reason):
+        """Immediately hands a failed item over to the aggregator, which retries it later or gives it up."""
+        self.connection.send({"retry": [(item, host, reason)]})
+        self._drop()
+
+    def defer(self, item, delay):
+        """Immediately hands an item over to the aggregator, which puts it back into the queue after 'delay' seconds."""
+        self.connection.send({"defer": [(item, delay)]})
+        self._drop()
+
+    def error(self, reason, launch=False):
+        """
+        Immediately notifies the supervisor that the worker stops due to an error, along with the item it held and
+        whether its browser failed to start ('launch').
+        """
+        self.connection.send({"error": (reason, self.item, launch)})
+
+    def send(self, characteristics=(), following=(), failed=(), done=(), queued=(), stats=(), fingerprints=(),
+             unchanged=()):
+        """
+        Adds the results of a single page to the batch and sends the batch if it is full. Along with the results the
+        scraped ('done') items, the items the worker put into the queue ('queued'), the timing record of the page
+        ('stats', see _page_stats), the new fingerprint of the page and whether it was unchanged are recorded.
+        Characteristics converted by a schema (a dictionary of typed columns, see result_schema.Schema) are added to the
+        columns of the batch.
+        """
+        if isinstance(characteristics, dict):
+            for name, values in characteristics.items():
+                self.batch["columns"].setdefault(name, []).extend(values)
+        else:
+            self.batch["characteristics"].extend(characteristics)
+        self.batch["following"].extend(following)
+        self.batch["failed"].extend(failed)
+        self.batch["done"].extend(done)
+        self.batch["queued"].extend(queued)
+        self.batch["stats"].extend(stats)
+        self.batch["fingerprints"].extend(fingerprints)
+        self.batch["unchanged"].extend(unchanged)
+        self.pages += 1
+        if self.pages >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Sends the current batch to the aggregator, if it holds any results."""
+        if any(self.batch.values()):
+            self.connection.send(self.batch)
+            self.batch = self._new_batch()
+        self.pages = 0
+
+    def close(self):
+        """
+        Sends the remaining results and closes the pipe, which signals the aggregator the worker is finished. The
+        aggregator is notified of the clean shutdown first, so a pipe closed without it shows the worker died.
+        """
+        self.flush()
+        self.connection.send({"closed": True})
+        self.connection.close()
+        self.closed = True
+
+
+class _QueueConnection(object):
+    """
+    The sending end of a worker thread's results, in place of a pipe. All threads put their batches, tagged with the
+    worker's number, into the same in-process queue; closing puts None, which signals the worker is finished.
+    """
+
+    def __init__(self, channel, th):
+        self.channel = channel
+        self.th = th
+
+    def send(self, batch):
+        self.channel.put((self.th, batch))
+
+    def close(self):
+        self.channel.put((self.th, None))
+
+
+def _page_stats(driver, item, host, waits, started, timeouts, failed, func_started=None, timings=None):
+    """
+    Returns the timing record of a scraped page (see metrics.ScrapeMetrics).
+    :param driver: the Driver object clone that scraped the page.
+    :param item: the scraped item.
+    :param host: the host of the page.
+    :param waits: the seconds the worker waited for the item in the queue and for the politeness scheduler.
+    :param started: the time the worker took the item.
+    :param timeouts: the Driver's number of timed out attempts when the worker took the item.
+    :param failed: True if the page could not be scraped.
+    :param func_started: the time the scraping function was called (None if it was not).
+    :param timings: the Driver's timings when the scraping function was called. A browser started or a soup parsed
+    within the function is not counted as the function's time.
+    """
+    record = {"worker": driver.name, "item": item, "host": host, "start": started, "total": time.time() - started,
+              "queue_wait": waits[0], "politeness_wait": waits[1], "retries": driver.timeouts - timeouts,
+              "bytes": driver.timings.get("bytes", 0), "failed": failed, "func": 0}
+    record.update({stage: driver.timings.get(stage, 0) for stage in ("launch", "navigation", "transfer", "parse")})
+    if func_started is not None:
+        record["func"] = time.time() - func_started - sum(driver.timings.get(stage, 0) - timings.get(stage, 0)
+                                                          for stage in ("launch", "parse"))
+    return record
+
+
+def _iter_links(links):
+    """
+    Yields the items to scrape from the 'links' parameter of Scraper.start: a single link or input duo, a path to a text
+    file with a link in every line, or any iterable (e.g. a list or a generator). Files and iterables are only read as
+    far as the items are needed.
+    """
+    if isinstance(links, tuple):
+        yield links
+    elif isinstance(links, str) and not links.startswith(("http://", "https://")) and os.path.isfile(links):
+        with open(links, encoding="utf8") as file:
+            for line in file:
+                if line.strip():
+                    yield line.strip()
+    elif isinstance(links, str):
+        yield links
+    else:
+        yield from links
+
+
+def _supervised(target, func, queue, results, driver, sleeptime, tries, pending, **kwargs):
+    """
+    Runs a worker function (Scraper._follow_links or Scraper.follow_dests). If the worker stops due to an error, the
+    error is sent to the supervisor (see Scraper._aggregate), which replaces the worker.
+    """
+    try:
+        target(func, queue, results, driver, sleeptime, tries, pending, **kwargs)
+    except Exception as e:
+        reason = type(e).__name__ + (": " + str(e) if str(e) else "")
+        if results.closed:
+            # All results were already sent, e.g. the browser could not be closed at the end
+            driver.save_to_log("\tDriver %s stopped with error %s after it finished" % (driver.name, reason),
+                               phase="close")
+        else:
+            results.error(reason, str(driver.failure).startswith("launch error"))
+            results.flush()
+            results.connection.close()
+        if kwargs.get("__debugmode__"):
+            raise
+
+
+class _WorkerGroup(object):
+    """
+    The workers of a scraping process. With the "process" engine every worker runs in its own process and sends its
+    results over its own pipe; with the "thread" engine the workers run on threads and share an in-process queue of
+    results. Workers can be added while the scraping process runs, and a worker that died can be replaced.
+    """
+
+    def __init__(self, engine, target, args, kwargs, batch_size=None):
+        """
+        :param engine: "process" or "thread".
+        :param target: the worker function (Scraper._follow_links or Scraper.follow_dests).
+        :param args: the worker function's arguments 'func', 'queue', 'sleeptime', 'tries' and 'pending'.
+        :param kwargs: the worker function's key-word arguments.
+        :param batch_size: the number of pages after which a worker sends its results.
+        """
+        self.engine = engine
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.batch_size = batch_size
+        self.channel = ThreadQueue()
+        self.readers = dict()
+        self.workers = dict()
+        self.holding = dict()
+        self.stops = dict()
+        self.running = set()
+        self.retiring = set()
+
+    def spawn(self, th, driver):
+        """Starts a worker with the Driver clone number 'th'."""
+        if th in self.workers:
+            # The previous worker with this Driver clone has to finish closing it first
+            self.workers[th].join()
+        func, queue, sleeptime, tries, pending = self.args
+        self.holding[th] = Value("b", 0, lock=False)
+        self.stops[th] = threading.Event() if self.engine == "thread" else Event()
+        self.retiring.discard(th)
+        if self.engine == "thread":
+            results = _ResultPipe(_QueueConnection(self.channel, th), self.batch_size, self.holding[th],
+                                  self.stops[th])
+            worker = threading.Thread(target=_supervised, name=driver.name, kwargs=self.kwargs,
+                                      args=(self.target, func, queue, results, driver, sleeptime, tries, pending))
+            worker.start()
+        else:
+            reader, writer = Pipe(duplex=False)
+            worker = Process(target=_supervised, kwargs=self.kwargs,
+                             args=(self.target, func, queue,
+                                   _ResultPipe(writer, self.batch_size, self.holding[th], self.stops[th]), driver,
+                                   sleeptime, tries, pending))
+            worker.start()
+            # The parent's copy of the sending end must be closed, so that the pipe reports EOF once the worker ends
+            writer.close()
+            self.readers[reader] = th
+        self.workers[th] = worker
+        self.running.add(th)
+
+    @property
+    def active(self):
+        """The Driver clone numbers of the running workers which were not asked to stop."""
+        return sorted(self.running - self.retiring)
+
+    def retire(self, th):
+        """Asks the worker with the Driver clone number 'th' to stop before it takes its next item."""
+        self.stops[th].set()
+        self.retiring.add(th)
+
+    @property
+    def queue(self):
+        """The queue of items the workers consume."""
+        return self.args[1]
+
+    def receive(self, timeout):
+        """
+        Receives the result batches of the workers until all of them are finished.
+        :param timeout: the number of seconds after which (None, None) is yielded if no batch arrived, or a function
+        returning it (called before every wait).
+        :return: a generator of (Driver clone number, batch) pairs. The batch is None when the worker finished.
+        """
+        wait_time = timeout if callable(timeout) else (lambda: timeout)
+        while self.running:
+            if self.engine == "thread":
+                try:
+                    th, batch = self.channel.get(True, wait_time())
+                except ThreadEmpty:
+                    yield None, None
+                    continue
+                if batch is None:
+                    self.running.discard(th)
+                yield th, batch
+                continue
+            ready = wait(list(self.readers), wait_time())
+            if not ready:
+                yield None, None
+            for reader in ready:
+                try:
+                    batch = reader.recv()
+                except EOFError:
+                    th = self.readers.pop(reader)
+                    self.running.discard(th)
+                    yield th, None
+                else:
+                    yield self.readers[reader], batch
+
+    def holds(self, th):
+        """
+        Returns 0 if the worker with the Driver clone number 'th' holds no unfinished item, 1 if it took one from the
+        queue and 2 if it also notified the aggregator of it.
+        """
+        return self.holding[th].value
+
+    def exitcode(self, th):
+        """Returns the exit code of a worker process, without waiting for it (None if it's not known yet)."""
+        return None if self.engine == "thread" else self.workers[th].exitcode
+
+    def stop(self):
+        """Stops all running workers: they finish their current item and take no other."""
+        for th in self.running:
+            self.stops[th].set()
+            self.queue.put(None)
+
+    def drain(self):
+        """Discards the results of the workers until all of them are finished, e.g. after the aggregator failed."""
+        for _ in self.receive(1):
+            pass
+
+    def join(self):
+        """Waits until all workers are finished."""
+        for worker in self.workers.values():
+            worker.join()
+
+
 class Scraper(object):
     """
     An object which defines the options for scraping: name of scraper, website(s) to scrape, number of concurrent
@@ -24,10 +366,13 @@ class Scraper(object):
     start: starts the crawling-scraping process given the function of scraping 'func'. Returns 3 lists: a list of lists
         of characteristics of the items, a list of possible links to follow, and a list of unsuccessfull connection
         addresses.
+    close: closes the browsers kept running by the Scraper's browser pool.
+    The items whose scraping function raised an error (or whose worker died otherwise) in the last scraping process are
+    kept in the list 'dead_letters' as retries.Failure records.
     """
 
     def __init__(self, name, websites, num_of_threads=3, driver=None, to_save="",
-                 options=None, to_log="", restrictions=None, **kwargs):
+                 options=None, to_log="", restrictions=None, pool_size=0, **kwargs):
         """
         The __init__ file for a Scraper object. In the process of initialization it populates the restrictions list if
         so set.
@@ -42,6 +387,10 @@ class Scraper(object):
         :param to_log: path to the logfile.
         :param restrictions: a list of restrictions for the webdrivers. If set to empty list, the restrictions will be
         ignored.
+        :param pool_size: the number of browsers that are started ahead of time and kept running between the calls of
+        Scraper.start (a browser pool). If 0, every Driver clone starts its browser on its first connection and closes
+        it at the end of the scraping process. The browsers can only be passed to the workers of the "process" engine if
+        the processes are forked (not on Windows); otherwise the pool is only used with the "thread" engine.
         :param kwargs: additional key-word arguments
         """
         self.name = name
@@ -57,7 +406,9 @@ class Scraper(object):
         if driver is None:
             driver = Driver(name=self.name, options=options, restrictions=restrictions,
                             to_log=to_log, proxy_port=kwargs.get("proxy_port"), profile=kwargs.get("profile"),
-                            executable_path=kwargs.get("executable_path"), bins_path=kwargs.get("bins_path"))
+                            executable_path=kwargs.get("executable_path"), bins_path=kwargs.get("bins_path"),
+                            robots_cache=kwargs.get("robots_cache"), robots_expiry=kwargs.get("robots_expiry", 86400),
+                            static=kwargs.get("static", False), recycle_after=kwargs.get("recycle_after", 0))
         else:
             cl_driver = False
         if not isinstance(driver, Driver):
@@ -69,51 +420,170 @@ class Scraper(object):
         self.drivers = [driver.export_Driver() for _ in range(self.num_of_threads)]
         for n, dr in enumerate(self.drivers):
             dr.name = self.name + "_cln%s" % n
-            if dr.to_log:
-                dr.to_log += "%s" % n
         if cl_driver:
-            driver.driver.quit()
+            driver.quit()
             del driver
+        self.pool = None
+        self.dead_letters = []
+        if pool_size > 0:
+            self.save_to_log("Starting browser pool. Number of browsers: %d" % min(pool_size, self.num_of_threads))
+            self.pool = BrowserPool(self.drivers, pool_size, webdriver_log=kwargs.get("webdriver_log", ""),
+                                    timeout=kwargs.get("timeout"))
+            self.pool.warm()
+
+    def close(self):
+        """Closes the browsers of the browser pool (if used)."""
+        if self.pool is not None:
+            self.save_to_log("Closing browser pool...")
+            self.pool.close()
 
-    def save_to_log(self, message, nblank=0, **kwargs):
+    def save_to_log(self, message, nblank=0, phase="", **kwargs):
         """
         Displays a message and saves it to the logfile if a logpath was given.
         :param message: the message to be displayed.
         :param nblank: number of strating blank rows (for better readability in the logfile)
+        :param phase: the phase of the scraping the message is about (a structured field of the log record).
         :param kwargs: additional key-word arguments.
         :return: a displayed message which might be stored in given logfile.
         """
-        print(u"%s%s" % ("\n"*nblank, message))
+        print(u"%s%s" % ("\n"*nblank, message), **kwargs)
         if self.to_log:
-            with open(self.to_log, "a", encoding="utf8") as logfile:
-                sys.stdout = logfile
-                print("%s%s:\t%s" % ("\n"*nblank, datetime.now().strftime("%d.%m.%Y %H:%M:%S"), message), **kwargs)
-                sys.stdout = sys.__stdout__
+            log(self.to_log, message, nblank, driver=self.name, phase=phase)
 
     def start(self, func, links=None, sleeptime=3, tries=0, num_of_threads=None, mp_func="_follow_links",
-              webdriver_log="", **kwargs):
+              webdriver_log="", stream=False, flush_size=500, flush_interval=30, checkpoint="", resume=False,
+              dedup=False, host_interval=None, burst=1, engine="process", backend=None,
+              adaptive=False, metrics=False, metrics_port=None, schema=None, fingerprints="", unchanged="cache",
+              priority=False, max_depth=None, max_pages=None, backoff=1, max_backoff=60, breaker_threshold=5,
+              breaker_cooldown=30, **kwargs):
         """
         Starts the process of crawling-scraping with given function 'func'. If not specified by the 'links' parameter
         the Scraper.websites list is scraped.
         :param func: the function with instructions for scraping.
-        :param links: links to be scraped. If left None, the list Scraper.websites will be scraped.
-        :param sleeptime: the time interval between each connection on a Driver object.
-        :param tries: number of tries if reached a timeout.
+        :param links: links to be scraped: a list (or any iterable, e.g. a generator) of links, a single link, or a path
+        to a text file with a link in every line. If left None, the list Scraper.websites will be scraped. The links are
+        put into the queue by a producer thread while the workers scrape, so no more than 'seed_buffer' of them are
+        pending at a time.
+        :param sleeptime: the time interval between each connection on a Driver object. Together with the number of
+        threads it sets the default 'host_interval'.
+        :param tries: the highest number of attempts of an item. A failed item is not retried by its worker at once, but
+        put back into the queue after a backoff delay (see 'backoff'); items failing for a reason that does not pass
+        with time (e.g. the HTTP status 404) are not retried. Defaults to 5 with _follow_links and 3 with follow_dests.
         :param num_of_threads: number of threads to be used for this work, cannot be higher than the Scraper number of
         threads
         :param mp_func: selection of the multiprocessing function. Defaults to _follow_links
         :param webdriver_log: where should the webdriver's log be saved to a file. Defaults to the src/logs dir. If None
         the log is not saved to a file but printed into the console.
-        :param kwargs: additional key-word arguments.
+        :param stream: if True, the characteristics are only appended to the savefile while scraping and are not kept in
+        memory; the first returned list is then empty. Requires the Scraper.to_save path.
+        :param flush_size: number of buffered rows after which they are written to the savefile.
+        :param flush_interval: number of seconds after which buffered rows are written to the savefile regardless of
+        their number.
+        :param checkpoint: path to the on-disk frontier (a SQLite database) which records the pending, in-flight, done
+        and failed items of the crawl. If left empty, no frontier is recorded (unless 'resume' is set).
+        :param resume: if True, the crawl continues from the pending and in-flight items of the frontier of an earlier
+        interrupted crawl, while the 'links' parameter is ignored. If no 'checkpoint' is given, the frontier is stored
+        next to the savefile.
+        :param dedup: if True, every link is put into the queue only once. The links are compared in their normalized
+        form (see link_index.normalize_link) with a Bloom filter shared between all threads. Only used with the
+        '_follow_links' function.
+        :param host_interval: the minimum time interval between connections to the same host, shared by all threads. The
+        robots 'Crawl-delay' of a host is used instead if it's longer. If left None, sleeptime / num_of_threads is used,
+        which keeps the rate of connections to a single host as it was with a sleep on every Driver object.
+        :param burst: the number of connections to a host that may follow each other without waiting.
+        :param engine: "process" runs every Driver clone in its own process; "thread" runs them on threads of this
+        process, which share the queue and the results without pickling. Since the workers mostly wait on the browsers
+        and the network, threads save the memory and the start-up time of a Python interpreter per worker. With threads
+        the function 'func' does not need to be picklable, but must not depend on global state of the scraping process.
+        :param backend: the backend holding the queue of items, the politeness scheduler, the index of seen links (with
+        'dedup') and a store of the results. If left None, a crawl_backend.LocalBackend is used. With a
+        crawl_backend.RemoteBackend several Scrapers on different nodes share the same queue and results.
+        :param adaptive: if True (or a concurrency.ConcurrencyController with custom limits), workers are added and
+        removed while scraping, between 1 and the Scraper's number of threads (or the controller's limits), based on the
+        measured page latency, timeouts, failures and the machine's CPU and memory usage. The scraping starts with
+        'num_of_threads' workers.
+        :param metrics: if True (or a path to a JSON lines file the records are appended to), the timing records of every
+        page and the counters of every worker are collected in a metrics.ScrapeMetrics object, which is returned as the
+        fourth output. With 'stream' the records are only written to the file.
+        :param metrics_port: if given, the counters are served in the Prometheus text format on this local port while
+        scraping (implies 'metrics').
+        :param schema: the fields of the characteristics, a result_schema.Schema or a list of (name, type) pairs. The
+        workers convert the values to the types (unconvertible values become None) and send them in typed columns; a
+        row with the wrong number of values is an error of the function 'func'. The savefile then starts with a header
+        row. The format of the savefile is given by its path: '.csv', compressed '.csv.gz' or a '.parquet' dataset
+        directory (requires pyarrow and a schema).
+        :param fingerprints: path to an on-disk store of page fingerprints (a SQLite database, see fingerprints.py),
+        kept across scraping processes. A page whose content did not change since it was last scraped (the server
+        replied 'not modified' to its ETag or Last-Modified, or its normalized page source has the same hash) is not
+        scraped with the function 'func' again; the links it returned before are still followed. Only used with the
+        '_follow_links' function.
+        :param unchanged: what is returned for unchanged pages: "cache" returns the results of the earlier scraping
+        process, "skip" returns no results for them.
+        :param priority: if True, the queue of items is a link_queue.PriorityLinkQueue instead of a FIFO queue: the
+        links to follow can be returned by 'func' as link_queue.Link objects with a priority (and depth), the links with
+        the highest priority are scraped first and the hosts take turns, so a single big host can't starve the others.
+        :param max_depth: the highest depth of the scraped links (the starting links have depth 0, the links found on
+        them depth 1, ...). Deeper links are not followed. Implies 'priority'.
+        :param max_pages: the highest number of items put into the queue, starting links included; once it's reached,
+        no more links are followed. Implies 'priority'.
+        :param backoff: the delay before the second attempt of a failed item in seconds; it doubles with every further
+        attempt, up to 'max_backoff' seconds, and a random share of up to a half is left out (jitter).
+        :param max_backoff: the longest delay between two attempts of an item in seconds.
+        :param breaker_threshold: the number of different items failing in a row on a host after which the host is
+        paused (its circuit breaker opens, see retries.CircuitBreaker). 0 disables the circuit breakers.
+        :param breaker_cooldown: the number of seconds a host is paused the first time; it doubles every time the host
+        is paused again.
+        :param kwargs: additional key-word arguments. The argument 'batch_size' sets the number of pages after which a
+        worker sends its results to the aggregator (defaults to 10). The argument 'dedup_capacity' sets the expected
+        number of links in the Bloom filter (defaults to 1000000). The argument 'seed_buffer' sets the number of pending
+        items up to which the producer puts new links into the queue (defaults to 10000). The argument 'max_respawns'
+        sets the number of times in a row a worker that died before it took an item (or because its browser could not
+        start) is replaced; then the scraping process stops with a RuntimeError (defaults to 3). A worker killed by an
+        error on an item always gets replaced.
         :return: 3 lists: a list of lists of characteristics of the items, a list of possible links to follow, and a
-        list of unsuccessfull connection addresses.
+        list of unsuccessfull connection addresses; with 'metrics' also the metrics.ScrapeMetrics object.
         """
-        tries = tries if tries else (15 if mp_func == "_follow_links" else 3)
-        kwargs.update({"webdriver_log": webdriver_log})
+        if stream and not self.to_save:
+            raise ValueError("Streaming mode requires a savefile path (Scraper.to_save)!")
+        if resume and not checkpoint:
+            if not self.to_save:
+                raise ValueError("Resuming requires a checkpoint path or a savefile path (Scraper.to_save)!")
+            checkpoint = self.to_save + ".frontier"
+        if engine not in ("process", "thread"):
+            raise ValueError("Parameter 'engine' must be either 'process' or 'thread'!")
+        if unchanged not in ("cache", "skip"):
+            raise ValueError("Parameter 'unchanged' must be either 'cache' or 'skip'!")
+        priority = priority or max_depth is not None or max_pages is not None
+        tries = tries if tries else (5 if mp_func == "_follow_links" else 3)
+        backend = LocalBackend() if backend is None else backend
+        schema = Schema(schema) if schema is not None and not isinstance(schema, Schema) else schema
+        kwargs.update({"webdriver_log": webdriver_log, "schema": schema, "priority": priority, "max_depth": max_depth,
+                       "max_pages": max_pages})
         mp_func = getattr(Scraper, mp_func)
         links = self.websites if links is None else links
-        links = [links] if isinstance(links, (str, tuple)) else links
-        self.save_to_log("Number of pages to scrape: %d" % len(links))
+        frontier = Frontier(checkpoint) if checkpoint else None
+        if frontier is not None:
+            if resume:
+                links = frontier.unfinished()
+                self.save_to_log("Resuming the crawl from frontier %s (done: %d, failed: %d)"
+                                 % (checkpoint, frontier.count(DONE), frontier.count(FAILED)))
+            else:
+                frontier.clear()
+        seen = None
+        if dedup and mp_func == Scraper._follow_links:
+            seen = backend.seen_links(kwargs.get("dedup_capacity") if kwargs.get("dedup_capacity") else 1000000)
+            if frontier is not None and resume:
+                for item in frontier.items(DONE, FAILED):
+                    seen.add(self.drivers[0].normalize_link(item))
+            kwargs.update({"seen_links": seen})
+        # The Scraper writes the new fingerprints, while the workers only read them from their own connections
+        fingerprint_store = None
+        if fingerprints and mp_func == Scraper._follow_links:
+            fingerprint_store = FingerprintStore(fingerprints)
+            kwargs.update({"fingerprints": fingerprints, "unchanged": unchanged})
+            self.save_to_log("Number of stored page fingerprints: %d" % fingerprint_store.count())
+        if isinstance(links, (list, set)):
+            self.save_to_log("Number of pages to scrape: %d" % len(links))
         if num_of_threads is None:
             num_of_threads = self.num_of_threads
         if num_of_threads > self.num_of_threads:
@@ -124,190 +594,586 @@ class Scraper(object):
             raise ValueError("Number of threads must be positive!")
         self.save_to_log("Starting crawling/scraping process with number of webdrivers: %d%s"
                          % (num_of_threads, "\n\n"), 1)
-        q = Queue()
-        with Manager() as manager:
-            wait_proc = manager.dict(zip([dr.name for dr in self.drivers][:num_of_threads],
-                                         [False for _ in range(num_of_threads)]))
-            characteristics = manager.list()
-            following_links = manager.list()
-            scrape_list = manager.list(links)
-            unsuccess = manager.list()
-            while scrape_list:
-                q.put(scrape_list.pop(0))
-            proc_list = []
+        host_interval = sleeptime / num_of_threads if host_interval is None else host_interval
+        scrape_metrics = None
+        if metrics or metrics_port is not None:
+            scrape_metrics = ScrapeMetrics(metrics if isinstance(metrics, str) else "", keep=not stream)
+            if metrics_port is not None:
+                self.save_to_log("\tServing metrics at http://127.0.0.1:%d/metrics" % scrape_metrics.serve(metrics_port))
+        controller = None
+        if adaptive:
+            controller = adaptive if isinstance(adaptive, ConcurrencyController) else ConcurrencyController()
+            if controller.max_workers is None:
+                controller.max_workers = self.num_of_threads
+            controller.max_workers = max(controller.max_workers, num_of_threads)
+            if controller.max_workers > len(self.drivers):
+                self._add_clones(controller.max_workers - len(self.drivers))
+            self.save_to_log("\tAdaptive concurrency: between %d and %d workers"
+                             % (controller.min_workers, controller.max_workers))
+        pool = self.pool
+        if pool is not None and engine == "process" and get_start_method() != "fork":
+            # Spawned processes get pickled copies of the Driver clones without their browsers, so every worker would
+            # start its own browser next to the idle ones of the pool
+            self.save_to_log("\tThe browser pool is only used with the 'thread' engine when the processes are not "
+                             "forked; closing its browsers")
+            pool.close()
+            pool = None
+        if pool is not None:
+            started = pool.warm(num_of_threads)
+            if started:
+                self.save_to_log("\tStarted %d browsers in the browser pool" % started)
+        # The messages of all workers are sent to a single writer of the logfile
+        with (Manager() if engine == "process" else nullcontext()) as manager, log_writer(self.to_log) as log_queue:
+            kwargs.update({"log_queue": log_queue})
+            backend.open(engine, manager)
+            q = backend.queue(priority)
+            pending = backend.counter(q)
+            pending.register(num_of_threads)
+            # The producer counts as a pending item until it put all links into the queue, so the workers never stop
+            # while links are still coming
+            pending.add(1)
+            kwargs.update({"scheduler": backend.scheduler(host_interval, burst),
+                           "breaker": backend.breaker(breaker_threshold, breaker_cooldown)})
+            workers = _WorkerGroup(engine, mp_func, (func, q, sleeptime, tries, pending), kwargs,
+                                   kwargs.get("batch_size"))
+            self.dead_letters = []
             for th in range(num_of_threads):
-                proc_list.append(Process(target=mp_func,
-                                         args=(func, q, characteristics, following_links, unsuccess,
-                                               self.drivers[th], sleeptime, tries, wait_proc),
-                                         kwargs=kwargs))
-            for p in proc_list:
-                p.start()
-                time.sleep(sleeptime)
-            for p in proc_list:
-                p.join()
-                time.sleep(sleeptime)
-            self.save_to_log("\tTransforming threaded results into list data, this might take some time...")
-            characteristics, following_links, unsuccess = characteristics[:], following_links[:], unsuccess[:]
-        if self.to_log:
-            ordered_logs = []
-            for th in range(num_of_threads):
-                with open(self.drivers[th].to_log, "r", encoding="utf8") as logfile_tmp:
-                    log = logfile_tmp.readlines()
-                    ordered_logs.extend(log)
-                os.remove(self.drivers[th].to_log)
-            with open(self.to_log, "a", encoding="utf8") as logfile:
-                logfile.writelines(sorted(ordered_logs))
-        if self.to_save:
-            with open(self.to_save, "a+", encoding="utf8", newline="") as cs:
-                writer = csv.writer(cs, delimiter=";", quotechar="\"")
-                writer.writerows(characteristics)
+                workers.spawn(th, self.drivers[th])
+            # New links are recorded in the frontier by the producer, while a resumed crawl's links are already in it
+            stop, seed_checkpoint = threading.Event(), checkpoint if frontier is not None and not resume else ""
+            producer = threading.Thread(target=self._seed, daemon=True,
+                                        args=(links, q, pending, seen, seed_checkpoint, stop,
+                                              kwargs.get("seed_buffer") if kwargs.get("seed_buffer") else 10000,
+                                              max_pages))
+            producer.start()
+            try:
+                characteristics, following_links, unsuccess, pages = self._aggregate(
+                    workers, frontier, backend, stream, flush_size, flush_interval, controller, pending, scrape_metrics,
+                    schema, fingerprint_store, RetryScheduler(tries, backoff, max_backoff),
+                    kwargs.get("max_respawns", 3))
+            except BaseException:
+                # The workers finish their current item, and their last results are discarded, so that none of them
+                # waits on a full pipe
+                workers.stop()
+                workers.drain()
+                raise
+            finally:
+                stop.set()
+                producer.join()
+                workers.join()
+                backend.close()
+                if scrape_metrics is not None:
+                    scrape_metrics.close()
+            if self.dead_letters:
+                self.save_to_log("\tNumber of dead letters (items whose scraping killed a worker): %d"
+                                 % len(self.dead_letters))
+            # Threads work on the Scraper's own Driver objects, whose page counters are already up to date
+            if pool is not None and engine == "process":
+                pool.record(pages)
+        if scrape_metrics is not None:
+            summary = scrape_metrics.summary()
+            self.save_to_log("\tScraped %d pages in %.1f s (%.2f pages/s, %d failed, %d retries)"
+                             % (summary["pages"], summary["seconds"], summary["pages_per_second"], summary["failures"],
+                                summary["retries"]))
+            return characteristics, following_links, unsuccess, scrape_metrics
         return characteristics, following_links, unsuccess
 
+    def _aggregate(self, workers, frontier, backend, stream, flush_size, flush_interval, controller=None, pending=None,
+                   metrics=None, schema=None, fingerprints=None, retries=None, max_respawns=3):
+        """
+        Collects the result batches of the workers until all of them are finished, appends the characteristics to the
+        savefile, passes the results to the backend's store and records the progress in the frontier. The failed items
+        are put back into the queue once their backoff delay passed, or given up after their last attempt. With a
+        concurrency controller, workers are also added and removed, with metrics the timing records are collected, and
+        with a fingerprint store the fingerprints of the scraped pages are stored.
+        :param workers: the workers of the scraping process (_WorkerGroup).
+        :param retries: the scheduler of the failed items (retries.RetryScheduler).
+        :param max_respawns: the number of times in a row a worker is replaced after it died before it took an item (or
+        because its browser could not start); then the scraping process fails with a RuntimeError.
+        :return: the lists of characteristics, links to follow and unsuccessful connections, and a list with the
+        number of pages scraped by each Driver clone.
+        """
+        characteristics, following_links, unsuccess = [], [], []
+        savefile = open_savefile(self.to_save, flush_size, flush_interval, schema) if self.to_save else None
+        pages = [0] * len(self.drivers)
+        unchanged, inflight, errors, closed, deaths = 0, dict(), dict(), set(), dict()
+        retries = RetryScheduler() if retries is None else retries
+        # The hosts of the items waiting for a retry, whose failures the circuit breakers remember until resolved
+        breaker, retrying = workers.kwargs.get("breaker"), dict()
+        timeout = flush_interval if controller is None else min(flush_interval, controller.interval)
+        try:
+            for th, batch in workers.receive(lambda: min(timeout, retries.timeout(timeout))):
+                if batch is None and th is not None and (th in errors or th not in closed):
+                    # The worker died: its item is given up as a dead letter and a new worker takes its place
+                    held = workers.holds(th)
+                    if th in errors:
+                        reason, item, launch = errors.pop(th)
+                    else:
+                        code = workers.exitcode(th)
+                        reason = "worker exited unexpectedly" + (" with code %d" % code if code is not None else "")
+                        # An item the aggregator was not notified of is unknown, but still released below
+                        item, launch = inflight.get(th) if held == 2 else None, False
+                    # Only the deaths before the worker took an item, or of its browser's start, count towards the
+                    # limit of replacements; an error on an item only gives that item up as a dead letter
+                    deaths[th] = deaths.get(th, 0) + 1 if launch or item is None and not held else 0
+                    self._replace(workers, th, item, reason, deaths[th] <= max_respawns and th not in workers.retiring)
+                    if th in workers.retiring:
+                        # The worker was being removed, so it's not replaced and no sentinel is needed for it
+                        pending.retire()
+                    if item is not None:
+                        if breaker is not None:
+                            # The worker may have been probing the host of its item
+                            breaker.cancel(self.dead_letters[-1].host, item)
+                        if item in retrying:
+                            breaker.forget(retrying.pop(item), item)
+                        backend.store([], [], [self.dead_letters[-1]])
+                        if frontier is not None:
+                            frontier.mark([item], FAILED)
+                            frontier.commit()
+                    if item is not None or held:
+                        pending.release()
+                    if deaths[th] > max_respawns:
+                        raise RuntimeError("Driver %s died %d times in a row (%s), stopping the scraping process"
+                                           % (self.drivers[th].name, deaths[th], reason))
+                elif batch is None:
+                    closed.discard(th)
+                elif "closed" in batch:
+                    closed.add(th)
+                elif "error" in batch:
+                    errors[th] = batch["error"]
+                elif "taken" in batch:
+                    inflight[th] = batch["taken"][-1]
+                    if frontier is not None:
+                        frontier.mark(batch["taken"], IN_FLIGHT)
+                elif batch is not None and "defer" in batch:
+                    for item, delay in batch["defer"]:
+                        retries.defer(item, delay)
+                elif batch is not None and "retry" in batch:
+                    for item, host, reason in batch["retry"]:
+                        pages[th] += 1
+                        # An input duo carries the number of its attempts from earlier scraping processes
+                        attempts = retries.failed(item, reason, item[1] if isinstance(item, tuple) else 0)
+                        if attempts is None:
+                            retrying[item] = host
+                            continue
+                        if retrying.pop(item, None) is not None:
+                            breaker.forget(host, item)
+                        failure = Failure(item, reason, attempts, host)
+                        unsuccess.append(failure)
+                        backend.store([], [], [failure])
+                        if frontier is not None:
+                            frontier.mark([item], FAILED)
+                            frontier.commit()
+                        pending.release()
+                elif batch is not None:
+                    pages[th] += len(batch["done"]) + len(batch["failed"])
+                    rows = batch["characteristics"] + (schema.rows(batch["columns"]) if batch["columns"] else [])
+                    if savefile is not None:
+                        # The typed columns go to the savefile as they are (a Parquet dataset writes them directly)
+                        savefile.writerows(batch["characteristics"])
+                        if batch["columns"]:
+                            savefile.writecolumns(batch["columns"])
+                    if not stream:
+                        characteristics.extend(rows)
+                    following_links.extend(batch["following"])
+                    unsuccess.extend(batch["failed"])
+                    if retrying:
+                        for item in batch["done"]:
+                            if item in retrying:
+                                retries.done(item)
+                                breaker.forget(retrying.pop(item), item)
+                    if controller is not None:
+                        controller.record(batch["stats"])
+                    if metrics is not None:
+                        metrics.record(batch["stats"])
+                    backend.store(rows, batch["following"], batch["failed"])
+                    unchanged += len(batch["unchanged"])
+                    if fingerprints is not None and batch["fingerprints"]:
+                        # As with the frontier, a page is only recorded as scraped once its results are saved
+                        if savefile is not None:
+                            savefile.flush()
+                        fingerprints.update(batch["fingerprints"])
+                        fingerprints.commit()
+                    if frontier is not None:
+                        # The results are saved before the frontier, so a checkpoint never skips unsaved pages
+                        if savefile is not None:
+                            savefile.flush()
+                        frontier.add(batch["queued"])
+                        frontier.mark(batch["done"], DONE)
+                        frontier.mark([failure.item for failure in batch["failed"]], FAILED)
+                        frontier.commit()
+                for item in retries.due():
+                    workers.queue.put(item)
+                if savefile is not None:
+                    savefile.tick()
+                if controller is not None:
+                    self._adapt(controller, workers, pending, backend)
+        finally:
+            if savefile is not None:
+                savefile.close()
+                if stream:
+                    self.save_to_log("\tNumber of rows saved to %s: %d" % (self.to_save, savefile.rows))
+            if frontier is not None:
+                frontier.close()
+            if fingerprints is not None:
+                fingerprints.close()
+                self.save_to_log("\tNumber of unchanged pages: %d" % unchanged)
+        return characteristics, following_links, unsuccess, pages
+
+    def _replace(self, workers, th, item, reason, respawn=True):
+        """
+        Replaces a worker that died (the supervisor of a scraping process, see Scraper._aggregate). The item the worker
+        held is added to the dead-letter list, and a new worker with a fresh clone of the Driver takes its place, so the
+        number of workers stays the same.
+        :param workers: the workers of the scraping process (_WorkerGroup).
+        :param th: the number of the worker's Driver clone.
+        :param item: the item the worker held when it died (None if it held none).
+        :param reason: the error the worker died of.
+        :param respawn: if False, the Driver clone is replaced, but no new worker is started (e.g. the worker was being
+        removed anyway, or died too many times in a row).
+        """
+        dead = self.drivers[th]
+        if item is not None:
+            try:
+                host = urlparse(dead.complete_link(item)).netloc if isinstance(item, str) else dead.domain
+            except ValueError:
+                host = ""
+            self.dead_letters.append(Failure(item, reason, 1, host))
+        self.save_to_log("\tDriver %s died while scraping %s (%s)%s" % (dead.name, item, reason, (
+            ", starting a new Driver clone in its place" if respawn else "")), phase="scrape")
+        self.drivers[th] = dead.export_Driver()
+        if respawn:
+            workers.spawn(th, self.drivers[th])
+
+    def _seed(self, links, queue, pending, seen=None, checkpoint="", stop=None, buffer=10000, max_pages=None,
+              chunk=500):
+        """
+        Puts the links into the queue (the producer of a scraping process, see Scraper.start). The links are read in
+        chunks and only while fewer than 'buffer' items are pending, so a huge list, generator or file of links is never
+        held in memory at once. With 'seen' (see 'dedup') only new links are put into the queue, and with a checkpoint
+        path every chunk is recorded in the frontier before its links are put into the queue. When all links are put
+        into the queue (or 'stop' is set, or 'max_pages' items were admitted), the producer's own pending item is
+        released.
+        """
+        frontier = Frontier(checkpoint) if checkpoint else None
+        links, number = _iter_links(links), 0
+        # A copy of the Driver completes the links, since the Driver itself may be changing its address on a thread
+        driver = copy.copy(self.drivers[0])
+        try:
+            while stop is None or not stop.is_set():
+                items = list(islice(links, chunk))
+                if not items:
+                    break
+                if seen is not None:
+                    items = [item for item in items if seen.add(driver.normalize_link(item))]
+                if max_pages is not None:
+                    admitted = queue.admit(items, max_pages)
+                    # Once the number of pages is reached, the rest of the links is not read
+                    links = links if len(admitted) == len(items) else iter(())
+                    items = admitted
+                if frontier is not None:
+                    frontier.add(items)
+                    frontier.commit()
+                for item in items:
+                    while pending.count() >= buffer and not (stop is not None and stop.is_set()):
+                        time.sleep(0.01)
+                    pending.add(1)
+                    queue.put(item)
+                    number += 1
+            self.save_to_log("\tNumber of links put into the queue: %d" % number)
+        except Exception as e:
+            self.save_to_log("\tCould not read the links to scrape due to error %s: %s" % (type(e).__name__, e))
+        finally:
+            if frontier is not None:
+                frontier.close()
+            pending.release()
+
+    def _adapt(self, controller, workers, pending, backend):
+        """Adds or removes a worker and slows down the struggling hosts, as decided by the concurrency controller."""
+        for host in controller.struggling_hosts():
+            workers.kwargs.get("scheduler").slow_down(host, controller.host_backoff)
+            self.save_to_log("\tAdaptive concurrency: slowing down the connections to %s" % host)
+        # The workers asked to stop are no longer counted, even if they did not finish their last item yet
+        active = workers.active
+        change = controller.decide(len(active), pending.count())
+        free = [th for th in range(controller.max_workers) if th not in workers.running]
+        if change > 0 and free and pending.register(1):
+            workers.spawn(free[0], self.drivers[free[0]])
+            self.save_to_log("\tAdaptive concurrency: added Driver %s, number of workers: %d"
+                             % (self.drivers[free[0]].name, len(workers.active)))
+        elif change < 0 and len(active) > 1:
+            workers.retire(active[-1])
+            self.save_to_log("\tAdaptive concurrency: removing Driver %s, number of workers: %d"
+                             % (self.drivers[active[-1]].name, len(workers.active)))
+
+    def _add_clones(self, number):
+        """Creates additional Driver clones, e.g. for the adaptive concurrency (see Scraper.start)."""
+        for n in range(len(self.drivers), len(self.drivers) + number):
+            dr = self.drivers[0].export_Driver()
+            dr.name = self.name + "_cln%s" % n
+            self.drivers.append(dr)
+
+    @staticmethod
+    def _report_failure(driver, breaker, host, item, results):
+        """
+        Hands an item the Driver could not load over to the aggregator, which retries it later or gives it up, and
+        records the failure in the circuit breaker of the host (once per item). A failure that does not pass with time
+        (e.g. the HTTP status 404) shows the host is reachable, so it counts as a success of the host.
+        """
+        reason = driver.failure if driver.failure else "page not loaded"
+        if not is_transient(reason):
+            breaker.success(host)
+        else:
+            pause = breaker.failure(host, item)
+            if pause == math.inf:
+                driver.save_to_log("\tDriver %s: giving up the host %s, which is still failing after %d pauses"
+                                   % (driver.name, host, breaker.max_opens), phase="connect")
+            elif pause:
+                driver.save_to_log("\tDriver %s: pausing the connections to %s for %d s after repeated failures"
+                                   % (driver.name, host, pause), phase="connect")
+        results.retry(item, host, reason)
+
+    @staticmethod
+    def _pause(item, host, delay, results):
+        """Hands an item of a host paused by its circuit breaker over to the aggregator (see _report_failure)."""
+        if delay == math.inf:
+            results.retry(item, host, "host down")
+        else:
+            results.defer(item, delay)
+
     @staticmethod
-    def _follow_links(func, queue, shared_list, shared_following, failed,
-                      driver, sleeptime, tries, wait_dict, **kwargs):
+    def _follow_links(func, queue, results, driver, sleeptime, tries, pending, **kwargs):
         """
         An auxiliary function for multithreading. Manages data exchange between threads and queue of addresses to
         connect to. After the queue is exhausted closes all webdrivers.
         :param func: the function with instructions for scraping.
         :param queue: the queue with addresses to connect to.
-        :param shared_list: a list of results (first list) from the function. Shared between all threads.
-        :param shared_following: a list of results (second list) from the function. Shared between all threads.
-        :param failed: a list of URL addresses that were unsuccessfully connected to during the run.
+        :param results: the worker's result pipe (_ResultPipe), which sends batches of results (first and second list
+        from the function) and unsuccessfully connected addresses to the aggregator of the Scraper.
         :param driver: the Driver object clone that connects to websites.
-        :param sleeptime: the time interval between each connection on a Driver object.
-        :param tries: number of tries if reached a timeout.
-        :param wait_dict: a dictionary, shared between all threads, where the status of each thread is shown. Used for
-        webdriver closing synchronization.
+        :param sleeptime: the time interval between each connection on a Driver object (the connections are paced by the
+        shared 'scheduler' from kwargs).
+        :param tries: the highest number of attempts of an item (counted by the aggregator, see Scraper._aggregate).
+        :param pending: the counter of pending items, shared between all threads (crawl_backend.PendingCounter). When
+        the last item is finished, every worker gets a None from the queue and stops.
         :param kwargs: additional key-word arguments.
-        :return: 3 lists: a list of lists of characteristics of the items, a list of possible links to follow, and a
-        list of unsuccessfull connection addresses.
+        :return: None; the results are sent to the aggregator through 'results'.
         """
-        fresh = driver.__fresh__
-        qto = kwargs.get("queue_timeout") if kwargs.get("queue_timeout") else 5
+        fresh, pooled = driver.__fresh__, driver.session
+        if kwargs.get("log_queue") is not None and driver.to_log:
+            attach_queue(driver.to_log, kwargs.get("log_queue"))
         kwargs.update({"n": 0, "page_queue": queue})
-        while not all(wait_dict.values()):
-            time.sleep(sleeptime)
+        scheduler, breaker, delays, waits = kwargs.get("scheduler"), kwargs.get("breaker"), set(), [0, 0]
+        store = FingerprintStore(kwargs.get("fingerprints")) if kwargs.get("fingerprints") else None
+        while True:
+            if results.retiring(pending):
+                break
+            waited = time.time()
             try:
-                link = queue.get(True, qto)
+                link = queue.get_nowait()
             except Empty:
-                wait_dict.update({driver.name: True})
+                # The results are sent before the worker waits for new items
+                results.flush()
+                link = queue.get()
+            waits[0] += time.time() - waited
+            if link is None:
+                break
+            # From here on an error of the worker gives the link up as a dead letter (see _supervised)
+            results.hold(link)
+            host = urlparse(driver.complete_link(link)).netloc
+            delay = breaker.allow(host, link)
+            if delay:
+                # The host is paused by its circuit breaker; the link waits with the aggregator until it's tried again,
+                # or is given up if the host is down
+                Scraper._pause(link, host, delay, results)
                 continue
-            else:
-                wait_dict.update({driver.name: False})
-            counter = 0
-            break_ = True
-            while break_ and counter < tries:
-                try:
-                    if not driver.get(link, n=tries-counter, webdriver_log=kwargs.get("webdriver_log"),
-                                      timeout=kwargs.get("timeout"), th=driver.name):
-                        driver.save_to_log("\tDriver %s: COULD NOT CONNECT TO ADDRESS %s\n\tSkipping crawling..."
-                                           % (driver.name, link))
-                        failed.append(link)
-                        break_ = False
-                    else:
-                        counter = tries
-                except WebDriverException:
-                    driver.save_to_log("Driver %s: Error while connecting to address %s, retrying..."
-                                       % (driver.name, link))
-                    counter += 1
-                    continue
-            if not break_:
+            delay = scheduler.acquire(host)
+            if delay:
+                # The host is not ready yet; the link goes back to the queue so a link to another host can go out, and
+                # the host may be probed for another link
+                breaker.cancel(host, link)
+                results.put_back(queue, link)
+                time.sleep(min(delay, 0.1))
+                waits[1] += min(delay, 0.1)
                 continue
+            results.taken(link)
+            started, timeouts = time.time(), driver.timeouts
+            record = store.get(link) if store is not None else None
+            # A single attempt: a failed link is retried later by the aggregator, so the worker moves on at once
             try:
-                reslist, resfollowing, next_page = func(driver, **kwargs)
+                loaded = driver.get(link, n=1, webdriver_log=kwargs.get("webdriver_log"), timeout=kwargs.get("timeout"),
+                                    th=driver.name, validators=record, partial=False)
+            except WebDriverException as e:
+                loaded, driver.failure = False, "browser error: %s" % type(e).__name__
+            if not loaded:
+                driver.save_to_log("\tDriver %s: COULD NOT CONNECT TO ADDRESS %s (%s)\n\tSkipping crawling..."
+                                   % (driver.name, link, driver.failure), phase="connect")
+                Scraper._report_failure(driver, breaker, host, link, results)
+                results.send(stats=[_page_stats(driver, link, host, waits, started, timeouts, True)])
+                waits = [0, 0]
+                continue
+            breaker.success(host)
+            if driver.crawl_delay and driver.domain not in delays:
+                scheduler.set_delay(driver.domain, driver.crawl_delay)
+                delays.add(driver.domain)
+            func_started, timings = time.time(), driver.timings
+            fingerprint = driver.fingerprint() if store is not None and not driver.not_modified else None
+            cached = record is not None and (driver.not_modified or fingerprint == record["fingerprint"])
+            try:
+                if cached:
+                    # The page did not change since it was last scraped, so its earlier results are used
+                    reslist, resfollowing, next_page = record["results"]
+                    if kwargs.get("unchanged") == "skip":
+                        reslist, resfollowing = [], []
+                    fingerprints = []
+                else:
+                    reslist, resfollowing, next_page = func(driver, **kwargs)
+                    fingerprints = [] if store is None else [(link, fingerprint, driver.etag, driver.last_modified,
+                                                              (reslist, resfollowing, next_page))]
+                if kwargs.get("schema") is not None:
+                    reslist = kwargs.get("schema").columns(reslist)
             except Exception as e:
                 driver.save_to_log("\tCLOSING DRIVER %s DUE TO ERROR: " % driver.name +
-                                   type(e).__name__ + ("\n\t" + str(e) if str(e) else "") + traceback.format_exc())
+                                   type(e).__name__ + ("\n\t" + str(e) if str(e) else "") + traceback.format_exc(),
+                                   phase="scrape")
+                if store is not None:
+                    store.close()
                 if kwargs.get("__debugmode__") is None or not kwargs.get("__debugmode__"):
-                    driver.driver.quit()
+                    driver.quit()
+                # The supervisor of the Scraper records the item as a dead letter and starts a new worker in its place
                 raise e
-            for new_link in next_page:
+            if kwargs.get("priority"):
+                next_page = child_links(link, next_page, kwargs.get("max_depth"))
+            queued = [new_link for new_link in next_page if kwargs.get("seen_links") is None or
+                      kwargs.get("seen_links").add(driver.normalize_link(new_link))]
+            if kwargs.get("max_pages") is not None:
+                queued = queue.admit(queued, kwargs.get("max_pages"))
+            # The new items are counted before they are put into the queue, and the finished item only after that
+            pending.add(len(queued))
+            for new_link in queued:
                 queue.put(new_link)
-            shared_list.extend(reslist)
-            shared_following.extend(resfollowing)
+            results.send(reslist, resfollowing, done=[link], queued=queued,
+                         stats=[_page_stats(driver, link, host, waits, started, timeouts, False, func_started, timings)],
+                         fingerprints=fingerprints, unchanged=[link] if cached else [])
+            results.release(pending)
+            waits = [0, 0]
             kwargs.update({"n": kwargs.get("n") + 1})
-        driver.save_to_log("\t\t\tCLOSING Driver %s, this might take some time..." % driver.name)
-        if all((driver.is_alive(), not driver.__fresh__, fresh)):
-            driver.driver.quit()
-            del driver.driver
+        results.close()
+        if store is not None:
+            store.close()
+        driver.save_to_log("\t\t\tCLOSING Driver %s, this might take some time..." % driver.name, phase="close")
+        # A browser from the Scraper's browser pool is kept running, unless it was replaced (recycled) by this worker
+        if all((driver.is_alive(), not driver.__fresh__, fresh or driver.session != pooled)):
+            driver.quit()
         return
 
     @staticmethod
-    def follow_dests(func, queue, shared_list, shared_following, failed,
-                     driver, sleeptime, tries, wait_dict, **kwargs):
+    def follow_dests(func, queue, results, driver, sleeptime, tries, pending, **kwargs):
         """
         An auxiliary function for multithreading. Manages data exchange between threads and queue of addresses to
         connect to. After the queue is exhausted closes all webdrivers.
         :param func: the function with instructions for scraping.
         :param queue: the queue with addresses to connect to.
-        :param shared_list: a list of results (first list) from the function. Shared between all threads.
-        :param shared_following: a list of results (second list) from the function. Shared between all threads.
-        :param failed: a list of URL addresses that were unsuccessfully connected to during the run.
+        :param results: the worker's result pipe (_ResultPipe), which sends batches of results (first and second list
+        from the function) and unsuccessfully connected addresses to the aggregator of the Scraper.
         :param driver: the Driver object clone that connects to websites.
-        :param sleeptime: the time interval between each connection on a Driver object.
-        :param tries: number of tries if reached a timeout.
-        :param wait_dict: a dictionary, shared between all threads, where the status of each thread is shown. Used for
-        webdriver closing synchronization.
+        :param sleeptime: the time interval between each connection on a Driver object (the connections are paced by the
+        shared 'scheduler' from kwargs).
+        :param tries: the highest number of attempts of an item (counted by the aggregator, see Scraper._aggregate).
+        :param pending: the counter of pending items, shared between all threads (crawl_backend.PendingCounter). When
+        the last item is finished, every worker gets a None from the queue and stops.
         :param kwargs: additional key-word arguments. MUST INCLUDE THE ARGUMENT 'input_duo': a tuple of parameter to
         input on site and number of executed tries.
-        :return: 3 lists: a list of lists of characteristics of the items, a list of possible links to follow, and a
-        list of unsuccessfull connection addresses.
+        :return: None; the results are sent to the aggregator through 'results'.
         """
-        fresh = driver.__fresh__
-        qto = kwargs.get("queue_timeout") if kwargs.get("queue_timeout") else 5
+        fresh, pooled = driver.__fresh__, driver.session
+        if kwargs.get("log_queue") is not None and driver.to_log:
+            attach_queue(driver.to_log, kwargs.get("log_queue"))
         kwargs.update({"n": 0, "page_queue": queue})
-        while not all(wait_dict.values()):
-            time.sleep(sleeptime)
+        scheduler, breaker, delays = kwargs.get("scheduler"), kwargs.get("breaker"), set()
+        while True:
+            if results.retiring(pending):
+                break
+            waited = time.time()
             try:
-                kwargs.update({"input_duo": queue.get(True, qto)})
+                kwargs.update({"input_duo": queue.get_nowait()})
             except Empty:
-                wait_dict.update({driver.name: True})
+                # The results are sent before the worker waits for new items
+                results.flush()
+                kwargs.update({"input_duo": queue.get()})
+            waits = [time.time() - waited, 0]
+            if kwargs.get("input_duo") is None:
+                break
+            results.hold(kwargs.get("input_duo"))
+            delay = breaker.allow(driver.domain, kwargs.get("input_duo"))
+            if delay:
+                # The host is paused by its circuit breaker; the item waits with the aggregator until it's tried again,
+                # or is given up if the host is down
+                Scraper._pause(kwargs.get("input_duo"), driver.domain, delay, results)
                 continue
-            else:
-                wait_dict.update({driver.name: False})
-            counter = 0
-            break_ = True
+            results.taken(kwargs.get("input_duo"))
+            # All items are used on the same page, so there is no other host to connect to in the meantime
+            waited = time.time()
+            scheduler.wait(driver.domain)
+            waits[1] = time.time() - waited
+            # The page is not always loaded again, so the timings of the previous item are discarded
+            started, timeouts, driver.timings = time.time(), driver.timeouts, dict()
             # In the case of a number of tries over limit, the program stops trying to connect
             if kwargs.get("input_duo")[1] >= tries:
-                break_ = False
                 driver.save_to_log("\tReached maximum number of allowed tries on %s" % driver.name)
-            # Reconnect to the original link only in the case when the link isn't the same (w/ or w/o trailing '/')
-            while break_ and (counter + kwargs.get("input_duo")[1]) < tries and \
-                (True if driver.driver is None else (driver.current_url != driver.driver.current_url and
-                                                     driver.current_url + "/" != driver.driver.current_url)):
+                results.send(failed=[Failure(kwargs.get("input_duo"), "too many tries", kwargs.get("input_duo")[1],
+                                             driver.domain)],
+                             stats=[_page_stats(driver, kwargs.get("input_duo"), driver.domain, waits, started, timeouts,
+                                                True)])
+                results.release(pending)
+                continue
+            # Reconnect to the original link only in the case when the link isn't the same (w/ or w/o trailing '/'),
+            # with a single attempt: a failed item is retried later by the aggregator
+            if driver.driver is None or (driver.current_url != driver.driver.current_url and
+                                         driver.current_url + "/" != driver.driver.current_url):
                 try:
-                    if not driver.get(driver.current_url, n=tries-counter,
-                                      webdriver_log=kwargs.get("webdriver_log"),
-                                      timeout=kwargs.get("timeout"), th=driver.name):
-                        driver.save_to_log("\tDriver %s, destination duo %s: COULD NOT CONNECT TO ADDRESS %s"
-                                           % (driver.name, str(kwargs.get("input_duo")[0]), driver.current_url))
-                        failed.append(kwargs.get("input_duo"))
-                        break_ = False
-                    else:
-                        counter = tries
-                except WebDriverException:
-                    driver.save_to_log("Driver %s: Error while connecting to address %s, retrying..."
-                                       % (driver.name, driver.current_url))
-                    counter += 1
+                    loaded = driver.get(driver.current_url, n=1, webdriver_log=kwargs.get("webdriver_log"),
+                                        timeout=kwargs.get("timeout"), th=driver.name, partial=False)
+                except WebDriverException as e:
+                    loaded, driver.failure = False, "browser error: %s" % type(e).__name__
+                if not loaded:
+                    driver.save_to_log("\tDriver %s, destination duo %s: COULD NOT CONNECT TO ADDRESS %s (%s)"
+                                       % (driver.name, str(kwargs.get("input_duo")[0]), driver.current_url,
+                                          driver.failure), phase="connect")
+                    Scraper._report_failure(driver, breaker, driver.domain, kwargs.get("input_duo"), results)
+                    results.send(stats=[_page_stats(driver, kwargs.get("input_duo"), driver.domain, waits, started,
+                                                    timeouts, True)])
                     continue
-            if not break_:
-                continue
+                breaker.success(driver.domain)
+            if driver.crawl_delay and driver.domain not in delays:
+                scheduler.set_delay(driver.domain, driver.crawl_delay)
+                delays.add(driver.domain)
+            func_started, timings = time.time(), driver.timings
             try:
                 reslist, resfollowing, next_page = func(driver, **kwargs)
+                if kwargs.get("schema") is not None:
+                    reslist = kwargs.get("schema").columns(reslist)
             except Exception as e:
                 driver.save_to_log("\tCLOSING DRIVER %s DUE TO ERROR: " % driver.name
-                                   + type(e).__name__ + ("\n\t" + str(e) if str(e) else "") + traceback.format_exc())
+                                   + type(e).__name__ + ("\n\t" + str(e) if str(e) else "") + traceback.format_exc(),
+                                   phase="scrape")
                 if kwargs.get("__debugmode__") is None or not kwargs.get("__debugmode__"):
-                    driver.driver.quit()
+                    driver.quit()
+                # The supervisor of the Scraper records the item as a dead letter and starts a new worker in its place
                 raise e
+            if kwargs.get("max_pages") is not None:
+                next_page = queue.admit(next_page, kwargs.get("max_pages"))
+            pending.add(len(next_page))
             for new_link in next_page:
                 queue.put(new_link)
-            shared_list.extend(reslist)
-            shared_following.extend(resfollowing)
+            results.send(reslist, resfollowing, done=[kwargs.get("input_duo")], queued=next_page,
+                         stats=[_page_stats(driver, kwargs.get("input_duo"), driver.domain, waits, started, timeouts,
+                                            False, func_started, timings)])
+            results.release(pending)
             kwargs.update({"n": kwargs.get("n") + 1})
-        driver.save_to_log("\t\t\tCLOSING Driver %s, this might take some time..." % driver.name)
-        if all((driver.is_alive(), not driver.__fresh__, fresh)):
-            driver.driver.quit()
-            del driver.driver
+        results.close()
+        driver.save_to_log("\t\t\tCLOSING Driver %s, this might take some time..." % driver.name, phase="close")
+        # A browser from the Scraper's browser pool is kept running, unless it was replaced (recycled) by this worker
+        if all((driver.is_alive(), not driver.__fresh__, fresh or driver.session != pooled)):
+            driver.quit()
         return
@@ -0,0 +1,83 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+import sqlite3  # On-disk database of the fingerprints
+import pickle  # Serialization of the cached results
+import hashlib  # Hashing of page sources
+import time  # Timestamps of the fingerprints
+import re  # Regular expressions
+
+# Parts of a page source that change on every load without changing its content: scripts, styles, comments, hidden
+# form tokens and whitespace
+_VOLATILE = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->"
+                       r"|<input[^>]+type=[\"']?hidden[^>]*>", re.IGNORECASE | re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def page_fingerprint(page_source):
+    """
+    Returns the fingerprint of a page source: a hash of its normalized form, without scripts, styles, comments and
+    hidden form fields and with collapsed whitespace, so pages differing only in these parts get the same fingerprint.
+    """
+    if isinstance(page_source, bytes):
+        page_source = page_source.decode("utf8", errors="replace")
+    normalized = _WHITESPACE.sub(" ", _VOLATILE.sub("", page_source)).strip()
+    return hashlib.sha1(normalized.encode("utf8")).hexdigest()
+
+
+class FingerprintStore(object):
+    """
+    An on-disk store of page fingerprints, kept in a SQLite database across scraping processes. For every URL address it
+    holds the fingerprint of the page (see page_fingerprint), its ETag and Last-Modified headers (if the server sent
+    them), the results of the scraping function on that page and the time of the last change. The workers of a Scraper
+    only read the store, while the Scraper writes the new fingerprints.
+    """
+
+    def __init__(self, path):
+        """
+        Opens (or creates) the fingerprint database.
+        :param path: path to the fingerprint database file.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS fingerprints (url TEXT PRIMARY KEY, "
+                                "fingerprint TEXT NOT NULL, etag TEXT, last_modified TEXT, results BLOB, "
+                                "updated REAL NOT NULL)")
+        self.connection.commit()
+
+    def get(self, url):
+        """
+        Returns the record of an URL address: a dictionary with the keys 'fingerprint', 'etag', 'last_modified',
+        'results' (a tuple of the three outputs of the scraping function) and 'updated', or None if it is not stored.
+        """
+        row = self.connection.execute("SELECT fingerprint, etag, last_modified, results, updated FROM fingerprints "
+                                      "WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {"fingerprint": row[0], "etag": row[1], "last_modified": row[2],
+                "results": pickle.loads(row[3]) if row[3] is not None else None, "updated": row[4]}
+
+    def update(self, records):
+        """
+        Stores new fingerprints.
+        :param records: a list of (url, fingerprint, etag, last_modified, results) tuples.
+        """
+        now = time.time()
+        self.connection.executemany("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?)",
+                                    [(url, fingerprint, etag, last_modified,
+                                      pickle.dumps(results) if results is not None else None, now)
+                                     for url, fingerprint, etag, last_modified, results in records])
+
+    def count(self):
+        """Returns the number of stored fingerprints."""
+        return self.connection.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def commit(self):
+        """Writes the stored fingerprints to the disk."""
+        self.connection.commit()
+
+    def close(self):
+        """Commits the changes and closes the database."""
+        self.connection.commit()
+        self.connection.close()
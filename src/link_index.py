@@ -0,0 +1,132 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode  # Parsing and rebuilding internet addresses
+from multiprocessing import Array  # Memory shared between processes
+import hashlib  # Hashing of the addresses
+import math  # Sizing of the Bloom filter
+import sqlite3  # On-disk index of previously scraped addresses
+import csv  # Reading the archived .csv files
+import os  # Module with tools for working with files and folders
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_link(link):
+    """
+    Returns the normalized form of an (absolute) URL address, so that different spellings of the same page compare as
+    equal: the scheme and domain are lower-cased, the default port, the fragment and the trailing "/" of the path are
+    removed and the query parameters are sorted.
+    """
+    parts = urlsplit(link.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if parts.port is not None and DEFAULT_PORTS.get(scheme) == parts.port:
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/") if parts.path not in ("", "/") else ""
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+class SharedBloomFilter(object):
+    """
+    A Bloom filter in memory shared between processes (and threads), which records the already seen URL addresses. Its
+    size is fixed by the expected number of addresses ('capacity') and the allowed rate of false positives, so the
+    memory stays bounded regardless of the size of the crawl: about 1.8 MB for a million addresses at a 0.1% rate. A
+    false positive means an address is wrongly taken as already seen and is not scraped.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        """
+        Allocates the shared bit array.
+        :param capacity: the expected number of addresses.
+        :param error_rate: the allowed rate of false positives at full capacity.
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = Array("B", (self.size + 7) // 8)
+
+    def _positions(self, item):
+        """Returns the bit positions of an item (double hashing of a single digest)."""
+        digest = hashlib.md5(item.encode("utf8")).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        bits = self.bits.get_obj()
+        return all(bits[p // 8] & (1 << (p % 8)) for p in self._positions(item))
+
+    def add(self, item):
+        """Records an item. Returns True if the item was not seen before, False otherwise."""
+        positions = self._positions(item)
+        bits = self.bits.get_obj()
+        new = False
+        with self.bits.get_lock():
+            for p in positions:
+                if not bits[p // 8] & (1 << (p % 8)):
+                    bits[p // 8] |= 1 << (p % 8)
+                    new = True
+        return new
+
+
+class LinkIndex(object):
+    """
+    A persistent index of previously scraped URL addresses, stored in a SQLite database. The addresses are read from
+    the first column of archived .csv files, and every file is only read once (or again if it was changed since). The
+    index is keyed, so one database can hold separate indices for different domains and characteristics.
+    """
+
+    def __init__(self, path, key=""):
+        """
+        Opens (or creates) the index database.
+        :param path: path to the index database file.
+        :param key: the key of the index in the database (e.g. the domain name and other characteristics).
+        """
+        self.path = path
+        self.key = key
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS links (key TEXT, link TEXT, PRIMARY KEY (key, link)) "
+                                "WITHOUT ROWID")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS files (key TEXT, name TEXT, size INTEGER, mtime REAL, "
+                                "PRIMARY KEY (key, name))")
+        self.connection.commit()
+
+    def update(self, files):
+        """
+        Reads the links from the given .csv files which were not read yet or were changed since. The first row of each
+        file is taken as the header and skipped.
+        :param files: a list of paths to .csv files.
+        :return: the number of files read.
+        """
+        read = 0
+        for file in files:
+            stat = os.stat(file)
+            name = os.path.basename(file)
+            row = self.connection.execute("SELECT size, mtime FROM files WHERE key = ? AND name = ?",
+                                          (self.key, name)).fetchone()
+            if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime:
+                continue
+            with open(file, "r", encoding="utf8") as article_links:
+                reader = csv.reader(article_links, delimiter=";")
+                next(reader, None)
+                self.connection.executemany("INSERT OR IGNORE INTO links (key, link) VALUES (?, ?)",
+                                            ((self.key, line[0]) for line in reader if line))
+            self.connection.execute("INSERT OR REPLACE INTO files (key, name, size, mtime) VALUES (?, ?, ?, ?)",
+                                    (self.key, name, stat.st_size, stat.st_mtime))
+            self.connection.commit()
+            read += 1
+        return read
+
+    def seen(self, link):
+        """Returns True if the link was found in any of the read files."""
+        return self.connection.execute("SELECT 1 FROM links WHERE key = ? AND link = ?",
+                                       (self.key, link)).fetchone() is not None
+
+    def __contains__(self, link):
+        return self.seen(link)
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM links WHERE key = ?", (self.key,)).fetchone()[0]
+
+    def close(self):
+        """Closes the index database."""
+        self.connection.close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from multiprocessing.managers import BaseManager  # Sharing the queue between processes
+from urllib.parse import urlparse  # Hosts of the links
+from collections import deque  # Round robin of the hosts
+from queue import Empty  # Exception of an empty queue
+import threading  # Guarding the queue shared by threads
+import heapq  # Items of a host ordered by priority
+
+
+class Link(str):
+    """
+    A link with a priority and a depth. The scraping function can return Link objects among the links to follow (the
+    third output) to have the more valuable pages scraped first; otherwise a Link is used like any other string.
+    """
+
+    def __new__(cls, link, priority=0, depth=None):
+        """
+        :param link: the URL address.
+        :param priority: the priority of the link; links with a higher priority are scraped first.
+        :param depth: the number of links followed from a starting link to reach this link. If left None, it's set to
+        the depth of the page the link was found on plus one.
+        """
+        new = super().__new__(cls, link)
+        new.priority = priority
+        new.depth = depth
+        return new
+
+    def __reduce__(self):
+        return Link, (str(self), self.priority, self.depth)
+
+
+def child_links(parent, items, max_depth=None):
+    """
+    Returns the links to follow from a page as Link objects with their depth: the depth of the page's link plus one,
+    unless the scraping function set it. Links deeper than 'max_depth' are left out. Items which are not strings (e.g.
+    the 'follow_dests' input duos) are returned as they are.
+    """
+    depth = (parent.depth if isinstance(parent, Link) and parent.depth is not None else 0) + 1
+    children = []
+    for item in items:
+        if isinstance(item, str):
+            item = Link(item, getattr(item, "priority", 0), depth if getattr(item, "depth", None) is None
+                        else item.depth)
+            if max_depth is not None and item.depth > max_depth:
+                continue
+        children.append(item)
+    return children
+
+
+class PriorityLinkQueue(object):
+    """
+    A queue of items to scrape with priorities and fairness between hosts, which can replace the Scraper's FIFO queue.
+    Every host has its own items, ordered by their priority (see Link) and then by the order they were put into the
+    queue. The next item is taken from the host with the most valuable item; among equally valuable hosts, the hosts
+    take turns (round robin), so a single big host can't starve the others. Stop signals (None) are always taken first.
+    The queue also keeps the number of admitted items, so a scraping process can be limited to a number of pages.
+    """
+
+    def __init__(self):
+        self.hosts = dict()
+        self.turns = deque()
+        self.signals = deque()
+        self.items = 0
+        self.admitted = 0
+        self.counter = 0
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def _host(item):
+        return urlparse(item).netloc if isinstance(item, str) else ""
+
+    def put(self, item, block=True, timeout=None):
+        """Puts an item into the queue; a None (a stop signal) is put before all items."""
+        with self.condition:
+            if item is None:
+                self.signals.append(item)
+            else:
+                host = self._host(item)
+                if not self.hosts.get(host):
+                    self.hosts[host] = []
+                    self.turns.append(host)
+                self.counter += 1
+                heapq.heappush(self.hosts[host], (-getattr(item, "priority", 0), self.counter, item))
+                self.items += 1
+            self.condition.notify()
+
+    def get(self, block=True, timeout=None):
+        """Removes and returns the next item; raises queue.Empty if there is none (within the timeout)."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.signals or self.items, timeout if block else 0):
+                raise Empty
+            if self.signals:
+                return self.signals.popleft()
+            best = min(self.hosts[host][0][0] for host in self.turns)
+            while self.hosts[self.turns[0]][0][0] != best:
+                self.turns.rotate(-1)
+            host = self.turns.popleft()
+            item = heapq.heappop(self.hosts[host])[2]
+            if self.hosts[host]:
+                self.turns.append(host)
+            else:
+                del self.hosts[host]
+            self.items -= 1
+            return item
+
+    def get_nowait(self):
+        """Removes and returns the next item; raises queue.Empty if there is none."""
+        return self.get(False)
+
+    def qsize(self):
+        """Returns the number of items (and stop signals) in the queue."""
+        with self.condition:
+            return self.items + len(self.signals)
+
+    def empty(self):
+        """Returns True if the queue holds no items."""
+        return self.qsize() == 0
+
+    def admit(self, items, max_pages=None):
+        """
+        Admits items into the scraping process while it has not reached its number of pages.
+        :param items: the items about to be put into the queue.
+        :param max_pages: the highest number of items admitted into the scraping process (None for no limit).
+        :return: the admitted items.
+        """
+        with self.condition:
+            items = list(items)
+            if max_pages is not None:
+                items = items[:max(0, max_pages - self.admitted)]
+            self.admitted += len(items)
+            return items
+
+
+class LinkQueueManager(BaseManager):
+    """The manager serving a PriorityLinkQueue to the worker processes of a Scraper."""
+    pass
+
+
+LinkQueueManager.register("PriorityLinkQueue", PriorityLinkQueue)
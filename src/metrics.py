@@ -0,0 +1,128 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler  # Local endpoint for the metrics
+import threading  # Serving the endpoint next to the scraping process
+import json  # JSON lines output
+import time  # Module to work with time objects
+
+# The stages of a page, in the order they happen
+STAGES = ("queue_wait", "politeness_wait", "launch", "navigation", "transfer", "parse", "func")
+
+
+class ScrapeMetrics(object):
+    """
+    Timing records of every scraped page and counters of every worker (Driver clone) of a scraping process. A record
+    holds the worker, the item, its host, the seconds spent in each stage (see STAGES) and in total, the number of timed
+    out attempts ('retries'), the size of the page source in bytes and whether the page failed.
+    """
+
+    def __init__(self, path="", keep=True):
+        """
+        :param path: path to a JSON lines file the records are appended to. If left empty, no file is written.
+        :param keep: if True, the records are kept in memory (in the attribute 'records').
+        """
+        self.path = path
+        self.keep = keep
+        self.records = []
+        self.workers = dict()
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.started = time.time()
+        self.finished = None
+        self.file = open(path, "a", encoding="utf8") if path else None
+        self.server = None
+        # The endpoint reads the counters from its own thread
+        self.lock = threading.Lock()
+
+    def record(self, records):
+        """Adds the timing records of scraped pages."""
+        with self.lock:
+            for page in records:
+                worker = self.workers.setdefault(page["worker"], {"pages": 0, "failures": 0, "retries": 0, "bytes": 0,
+                                                                  "seconds": 0.0})
+                worker["pages"] += 1
+                worker["failures"] += int(page["failed"])
+                worker["retries"] += page["retries"]
+                worker["bytes"] += page["bytes"]
+                worker["seconds"] += page["total"]
+                for stage in STAGES:
+                    self.stages[stage] += page.get(stage, 0)
+            if self.keep:
+                self.records.extend(records)
+        if self.file is not None:
+            self.file.writelines(json.dumps(page, ensure_ascii=False, default=str) + "\n" for page in records)
+            self.file.flush()
+
+    def elapsed(self):
+        """Returns the number of seconds since the start of the scraping process (until its end, if it ended)."""
+        return (self.finished if self.finished is not None else time.time()) - self.started
+
+    def summary(self):
+        """
+        Returns a dictionary with the totals of the scraping process ('pages', 'failures', 'retries', 'bytes',
+        'seconds', 'pages_per_second'), the total seconds of each stage ('stages') and the counters of each worker
+        ('workers', with their own 'pages_per_second').
+        """
+        elapsed = max(self.elapsed(), 1e-9)
+        with self.lock:
+            workers = {name: dict(counters, pages_per_second=counters["pages"] / elapsed)
+                       for name, counters in self.workers.items()}
+            stages = dict(self.stages)
+        totals = {key: sum(counters[key] for counters in workers.values())
+                  for key in ("pages", "failures", "retries", "bytes")}
+        totals.update({"seconds": elapsed, "pages_per_second": totals["pages"] / elapsed, "stages": stages,
+                       "workers": workers})
+        return totals
+
+    def prometheus(self):
+        """Returns the counters in the Prometheus text format."""
+        summary = self.summary()
+        lines = []
+        for key, kind in (("pages", "counter"), ("failures", "counter"), ("retries", "counter"), ("bytes", "counter"),
+                          ("pages_per_second", "gauge")):
+            name = "scraper_%s%s" % (key, "_total" if kind == "counter" else "")
+            lines.append("# TYPE %s %s" % (name, kind))
+            for worker, counters in sorted(summary["workers"].items()):
+                lines.append("%s{worker=\"%s\"} %s" % (name, worker, counters[key]))
+        lines.append("# TYPE scraper_stage_seconds_total counter")
+        for stage in STAGES:
+            lines.append("scraper_stage_seconds_total{stage=\"%s\"} %s" % (stage, summary["stages"][stage]))
+        lines.append("# TYPE scraper_elapsed_seconds gauge")
+        lines.append("scraper_elapsed_seconds %s" % summary["seconds"])
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9100, host="127.0.0.1"):
+        """
+        Serves the counters in the Prometheus text format at http://host:port/metrics from a background thread.
+        :return: the port of the endpoint (a free one is chosen if 'port' is 0).
+        """
+        metrics = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                return
+
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def close(self):
+        """Marks the end of the scraping process, closes the JSON lines file and stops the endpoint."""
+        self.finished = time.time() if self.finished is None else self.finished
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
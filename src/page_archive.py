@@ -0,0 +1,68 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+import sqlite3  # On-disk database of the archive
+import zlib  # Compression of the page sources
+import json  # Serialization of the response headers
+import time  # Timestamps of the recorded pages
+
+
+class PageArchive(object):
+    """
+    A compressed on-disk archive of visited pages, stored in a SQLite database. For every requested URL address it
+    holds the final page source (compressed with zlib), the address the page ended on (after redirects), the response
+    headers and the time it was recorded. A Driver in 'record' mode saves every page it loads into the archive, while a
+    Driver in 'replay' mode serves the pages from it without connecting to the internet or starting a browser.
+    """
+
+    def __init__(self, path):
+        """
+        Opens (or creates) the archive database.
+        :param path: path to the archive database file.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, final_url TEXT, source BLOB, "
+                                "binary INTEGER NOT NULL, headers TEXT, recorded REAL NOT NULL)")
+        self.connection.commit()
+
+    def record(self, url, page_source, final_url=None, headers=None):
+        """
+        Saves a page into the archive, replacing an earlier record of the same address.
+        :param url: the requested URL address.
+        :param page_source: the page source, a string or bytes (if the server did not declare a charset).
+        :param final_url: the address the page ended on; if left None, the requested address.
+        :param headers: a dictionary of response headers to keep with the page (e.g. 'etag' and 'last_modified').
+        """
+        binary = isinstance(page_source, bytes)
+        data = page_source if binary else page_source.encode("utf8")
+        self.connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                                (url, final_url if final_url else url, zlib.compress(data), int(binary),
+                                 json.dumps(headers if headers else dict()), time.time()))
+        self.connection.commit()
+
+    def replay(self, url):
+        """
+        Returns the record of an URL address: a dictionary with the keys 'url', 'final_url', 'page_source', 'headers'
+        and 'recorded', or None if the address was not recorded.
+        """
+        row = self.connection.execute("SELECT final_url, source, binary, headers, recorded FROM pages WHERE url = ?",
+                                      (url,)).fetchone()
+        if row is None:
+            return None
+        data = zlib.decompress(row[1])
+        return {"url": url, "final_url": row[0], "page_source": data if row[2] else data.decode("utf8"),
+                "headers": json.loads(row[3]), "recorded": row[4]}
+
+    def urls(self):
+        """Returns a list of the recorded URL addresses, in the order they were (last) recorded."""
+        return [row[0] for row in self.connection.execute("SELECT url FROM pages ORDER BY rowid")]
+
+    def count(self):
+        """Returns the number of recorded pages."""
+        return self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        """Closes the archive database."""
+        self.connection.close()
@@ -0,0 +1,63 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+import time  # Module to work with time objects
+
+
+class PolitenessScheduler(object):
+    """
+    A token bucket per host, shared between all workers of a Scraper. Each host gets a token every 'interval' seconds (or
+    every 'Crawl-delay' seconds of its robots file, if that is longer) and can save up to 'burst' tokens. A worker takes a
+    token before it connects to a host; if there is none, it gets the time until the next one, so it can connect to
+    another host in the meantime instead of sleeping.
+    """
+
+    def __init__(self, buckets, lock, interval=3, burst=1):
+        """
+        :param buckets: a (shared) dictionary of buckets, e.g. Manager.dict() for processes or dict() for threads.
+        :param lock: a (shared) lock guarding the buckets, e.g. Manager.Lock() or threading.Lock().
+        :param interval: the minimum time interval between connections to the same host, in seconds.
+        :param burst: the maximum number of connections to a host that may follow each other without waiting.
+        """
+        self.buckets = buckets
+        self.lock = lock
+        self.interval = interval
+        self.burst = max(1, burst)
+
+    def set_delay(self, host, delay):
+        """Sets the crawl delay of a host; the host's interval becomes the longer of the delay and the default one."""
+        with self.lock:
+            tokens, last, _ = self.buckets.get(host, (self.burst, time.time(), self.interval))
+            self.buckets[host] = (tokens, last, max(self.interval, delay if delay else 0))
+
+    def slow_down(self, host, factor=2, minimum=1):
+        """Multiplies the interval of a host by 'factor' (but makes it at least 'minimum' seconds)."""
+        with self.lock:
+            tokens, last, interval = self.buckets.get(host, (self.burst, time.time(), self.interval))
+            self.buckets[host] = (tokens, last, max(interval * factor, minimum))
+
+    def acquire(self, host):
+        """
+        Takes a token of the host.
+        :param host: the host (domain) to connect to.
+        :return: 0 if the token was taken and the connection may go out, otherwise the number of seconds until the host
+        has a token.
+        """
+        with self.lock:
+            now = time.time()
+            tokens, last, interval = self.buckets.get(host, (self.burst, now, self.interval))
+            if interval > 0:
+                tokens = min(self.burst, tokens + (now - last) / interval)
+            else:
+                tokens = self.burst
+            if tokens >= 1:
+                self.buckets[host] = (tokens - 1, now, interval)
+                return 0
+            self.buckets[host] = (tokens, now, interval)
+            return (1 - tokens) * interval
+
+    def wait(self, host):
+        """Waits until a token of the host is taken (for workers that have no other host to connect to)."""
+        delay = self.acquire(host)
+        while delay > 0:
+            time.sleep(delay)
+            delay = self.acquire(host)
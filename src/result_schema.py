@@ -0,0 +1,227 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from datetime import datetime, date  # Date and time fields
+import csv  # Module to work .csv files
+import gzip  # Compressed .csv files
+import io  # Rows of a compressed chunk
+import time  # Module to work with time objects
+import os  # Module with tools for working with files and folders
+try:
+    import pyarrow  # Columnar tables (optional)
+    import pyarrow.parquet  # Parquet files (optional)
+except ImportError:
+    pyarrow = None
+
+
+class Schema(object):
+    """
+    A typed schema of the scraped records: the names and types of the fields (the columns of the characteristics
+    returned by the scraping function). The supported types are str, int, float, bool, datetime and date. The values
+    are converted to the types by the workers, which send them in columns (one list per field) instead of rows.
+    """
+
+    TYPES = (str, int, float, bool, datetime, date)
+
+    def __init__(self, fields):
+        """
+        :param fields: a list of (name, type) pairs.
+        """
+        self.fields = [(name, kind) for name, kind in fields]
+        if not self.fields:
+            raise ValueError("A schema must have at least one field!")
+        for name, kind in self.fields:
+            if kind not in self.TYPES:
+                raise TypeError("Field '%s' has an unsupported type %s" % (name, kind))
+
+    @property
+    def names(self):
+        """The names of the fields."""
+        return [name for name, _ in self.fields]
+
+    @staticmethod
+    def _convert(value, kind):
+        """Converts a value to the type of a field. Empty and unconvertible values are returned as None."""
+        if value is None or isinstance(value, kind) and not (kind is int and isinstance(value, bool)):
+            return value
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                return None
+        try:
+            if kind is bool:
+                return value.lower() in ("1", "true", "yes", "da") if isinstance(value, str) else bool(value)
+            if kind is datetime:
+                return datetime.fromisoformat(value) if isinstance(value, str) else None
+            if kind is date:
+                return date.fromisoformat(value[:10]) if isinstance(value, str) else (
+                    value.date() if isinstance(value, datetime) else None)
+            if kind is int and isinstance(value, str):
+                return int(float(value.replace(",", "."))) if "." in value or "," in value else int(value)
+            if kind in (int, float) and isinstance(value, str):
+                return kind(value.replace(",", "."))
+            return kind(value)
+        except (TypeError, ValueError):
+            return None
+
+    def columns(self, rows):
+        """
+        Converts rows of characteristics to typed columns.
+        :param rows: a list of rows, each with a value for every field.
+        :return: a dictionary with a list of values for every field.
+        """
+        columns = {name: [] for name in self.names}
+        for row in rows:
+            if len(row) != len(self.fields):
+                raise ValueError("A row has %d values, but the schema has %d fields: %s"
+                                 % (len(row), len(self.fields), row))
+            for value, (name, kind) in zip(row, self.fields):
+                columns[name].append(self._convert(value, kind))
+        return columns
+
+    def rows(self, columns):
+        """Converts typed columns back to rows."""
+        return [list(row) for row in zip(*[columns[name] for name in self.names])]
+
+    def arrow_schema(self):
+        """Returns the schema as a pyarrow schema."""
+        types = {str: pyarrow.string(), int: pyarrow.int64(), float: pyarrow.float64(), bool: pyarrow.bool_(),
+                 datetime: pyarrow.timestamp("us"), date: pyarrow.date32()}
+        return pyarrow.schema([(name, types[kind]) for name, kind in self.fields])
+
+
+class CsvWriter(object):
+    """
+    Appends rows to a .csv savefile in buffered batches. The buffer is written to the file when it holds 'flush_size'
+    rows or when 'flush_interval' seconds have passed since the last write, whichever comes first. With a schema, a new
+    file starts with a header row of the field names.
+    """
+
+    header = True
+
+    def __init__(self, path, flush_size=500, flush_interval=30, schema=None):
+        self.path = path
+        self.schema = schema
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.buffer = self._new_buffer()
+        self.last_flush = time.time()
+        self.rows = 0
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._open()
+        if self.header and self.schema is not None and new:
+            self._write([self.schema.names])
+
+    @staticmethod
+    def _new_buffer():
+        return []
+
+    @property
+    def buffered(self):
+        """The number of buffered rows."""
+        return len(self.buffer)
+
+    def _open(self):
+        self.file = open(self.path, "a+", encoding="utf8", newline="")
+        self.writer = csv.writer(self.file, delimiter=";", quotechar="\"")
+
+    def _write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def writerows(self, rows):
+        """Adds rows to the buffer and flushes it if it's full or too old."""
+        self.buffer.extend(rows)
+        self.tick()
+
+    def writecolumns(self, columns):
+        """Adds typed columns (see Schema.columns) to the buffer as rows."""
+        self.writerows(self.schema.rows(columns))
+
+    def tick(self):
+        """Flushes the buffer if it's full or if the flush interval has passed."""
+        if self.buffered >= self.flush_size or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered rows to the savefile."""
+        if self.buffered:
+            self._write(self.buffer)
+            self.rows += self.buffered
+            self.buffer = self._new_buffer()
+        self.last_flush = time.time()
+
+    def close(self):
+        """Writes the remaining rows and closes the savefile."""
+        self.flush()
+        self.file.close()
+
+
+class GzipCsvWriter(CsvWriter):
+    """
+    Appends rows to a gzip compressed .csv savefile (.csv.gz). Every flush of the buffer is written as a separate gzip
+    member (a chunk), so an interrupted scraping process leaves a readable file, and the file can be appended to.
+    """
+
+    def _open(self):
+        self.file = open(self.path, "ab")
+
+    def _write(self, rows):
+        text = io.StringIO(newline="")
+        csv.writer(text, delimiter=";", quotechar="\"").writerows(rows)
+        self.file.write(gzip.compress(text.getvalue().encode("utf8")))
+        self.file.flush()
+
+
+class ParquetWriter(CsvWriter):
+    """
+    Writes typed columns to Parquet files. The savefile path is a directory (a Parquet dataset), where every scraping
+    process writes its own part file, with one row group per flush of the buffer. The buffer holds columns, so the typed
+    columns of the workers are written as they are. Requires the module pyarrow and a schema.
+    """
+
+    header = False
+
+    def __init__(self, path, flush_size=500, flush_interval=30, schema=None):
+        if pyarrow is None:
+            raise ImportError("Parquet output requires the module pyarrow!")
+        if schema is None:
+            raise ValueError("Parquet output requires a schema!")
+        super().__init__(path, flush_size, flush_interval, schema)
+
+    def _open(self):
+        os.makedirs(self.path, exist_ok=True)
+        part = os.path.join(self.path, "part-%s-%d.parquet" % (time.strftime("%Y%m%d%H%M%S"), os.getpid()))
+        self.file = pyarrow.parquet.ParquetWriter(part, self.schema.arrow_schema())
+
+    def _new_buffer(self):
+        return {name: [] for name in self.schema.names}
+
+    @property
+    def buffered(self):
+        """The number of buffered rows."""
+        return len(self.buffer[self.schema.names[0]])
+
+    def writerows(self, rows):
+        """Converts rows to typed columns and adds them to the buffer."""
+        self.writecolumns(self.schema.columns(rows))
+
+    def writecolumns(self, columns):
+        """Adds typed columns (see Schema.columns) to the buffer and flushes it if it's full or too old."""
+        for name in self.schema.names:
+            self.buffer[name].extend(columns[name])
+        self.tick()
+
+    def _write(self, columns):
+        self.file.write_table(pyarrow.table(columns, schema=self.schema.arrow_schema()))
+
+
+def open_savefile(path, flush_size=500, flush_interval=30, schema=None):
+    """
+    Opens a buffered writer of a savefile in the format given by its path: a Parquet dataset (directory) if the path
+    ends with '.parquet', a gzip compressed .csv file if it ends with '.gz', otherwise a .csv file.
+    """
+    if path.endswith(".parquet"):
+        return ParquetWriter(path, flush_size, flush_interval, schema)
+    if path.endswith(".gz"):
+        return GzipCsvWriter(path, flush_size, flush_interval, schema)
+    return CsvWriter(path, flush_size, flush_interval, schema)
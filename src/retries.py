@@ -0,0 +1,225 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from collections import namedtuple  # Records of unsuccessful items
+import math  # Infinite pause of a host that stays down
+import random  # Jitter of the retry delays
+import heapq  # Retried items ordered by the time they are due
+import time  # Module to work with time objects
+
+# An item that could not be scraped: the item itself, the reason of its last failure, the number of attempts and the
+# host it was tried on
+Failure = namedtuple("Failure", ("item", "reason", "attempts", "host"))
+
+# Reasons of failure that may pass with time (see Driver.failure); other failures are not retried
+TRANSIENT = ("timeout", "connection error", "HTTP status 429", "HTTP status 5", "browser error")
+
+
+def is_transient(reason):
+    """Returns True if a failure with the given reason (see Driver.failure) is worth retrying later."""
+    return reason is not None and reason.startswith(TRANSIENT)
+
+
+def backoff_delay(attempt, base=1, cap=60):
+    """
+    Returns the delay before the next attempt of an item in seconds: an exponential backoff with jitter. The delay
+    doubles with every attempt (up to 'cap' seconds), and a random half of it is left out, so the items failed at the
+    same time are not retried at the same time.
+    :param attempt: the number of attempts of the item so far (at least 1).
+    :param base: the delay after the first attempt in seconds (before the jitter).
+    :param cap: the longest delay in seconds (before the jitter).
+    """
+    delay = min(cap, base * 2 ** (max(attempt, 1) - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryScheduler(object):
+    """
+    The items waiting to be tried again, kept by the Scraper in a heap ordered by the time they are due. A failed item
+    is not retried by its worker; the worker moves on to the next item at once, while the item is put back into the
+    queue once its backoff delay (see backoff_delay) has passed. The number of attempts of every item is counted here.
+    """
+
+    def __init__(self, tries=5, base=1, cap=60):
+        """
+        :param tries: the highest number of attempts of an item.
+        :param base: the delay after the first attempt in seconds.
+        :param cap: the longest delay between two attempts in seconds.
+        """
+        self.tries = tries
+        self.base = base
+        self.cap = cap
+        self.heap = []
+        self.attempts = dict()
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def failed(self, item, reason, previous=0):
+        """
+        Counts a failed attempt of an item and schedules its next attempt, if it has one left and the reason of the
+        failure is transient.
+        :param item: the failed item.
+        :param reason: the reason of the failure (see Driver.failure).
+        :param previous: the number of attempts of the item before this scraping process (e.g. of an input duo).
+        :return: the number of attempts of the item if it was given up, otherwise None.
+        """
+        attempts = self.attempts.get(item, previous) + 1
+        if attempts >= self.tries or not is_transient(reason):
+            self.attempts.pop(item, None)
+            return attempts
+        self.attempts[item] = attempts
+        self.defer(item, backoff_delay(attempts, self.base, self.cap))
+        return None
+
+    def defer(self, item, delay):
+        """Schedules an item to be put back into the queue after 'delay' seconds, without counting an attempt."""
+        self.counter += 1
+        heapq.heappush(self.heap, (time.time() + delay, self.counter, item))
+
+    def done(self, item):
+        """Forgets the attempts of a scraped item."""
+        self.attempts.pop(item, None)
+
+    def due(self):
+        """Removes and returns the items whose delay has passed."""
+        items, now = [], time.time()
+        while self.heap and self.heap[0][0] <= now:
+            items.append(heapq.heappop(self.heap)[2])
+        return items
+
+    def timeout(self, default=None):
+        """Returns the number of seconds until the next item is due, or 'default' if no item is waiting."""
+        return max(0.0, self.heap[0][0] - time.time()) if self.heap else default
+
+
+class CircuitBreaker(object):
+    """
+    A circuit breaker per host, shared between all workers of a Scraper. After transient failures of 'threshold'
+    different items in a row on a host, the host's circuit opens and no connections are made to it for 'cooldown'
+    seconds; the items of the host wait until then without losing an attempt. Then a single probe connection is let
+    through: if it succeeds, the circuit closes; if it fails, the circuit opens again for twice as long. If the probe
+    still fails after 'max_opens' pauses, the host is down for good and its items are given up. A probe whose item goes
+    back into the queue is cancelled, and a probe that gets no result in 'probe_timeout' seconds (e.g. its worker died)
+    is let through again for another item.
+    Every item counts only once: the failed items of a host are remembered until the Scraper forgets them (once they are
+    scraped or given up), and their retries neither count again nor wait for the circuit (or probe it), but follow their
+    own backoff (see RetryScheduler). So a few pages that always fail can't pause the whole host. A forgotten item that
+    was given up no longer counts either, so a host whose failed items were all given up closes again, unless it's
+    down for good. Only the hosts with failures are kept in the shared dictionary.
+    """
+
+    def __init__(self, states, lock, threshold=5, cooldown=30, max_opens=4, probe_timeout=120):
+        """
+        :param states: a (shared) dictionary of states, e.g. Manager.dict() for processes or dict() for threads.
+        :param lock: a (shared) lock guarding the states, e.g. Manager.Lock() or threading.Lock().
+        :param threshold: the number of different items failing in a row that opens the circuit of a host (0 disables
+        the breaker).
+        :param cooldown: the number of seconds the circuit of a host stays open the first time.
+        :param max_opens: the number of pauses of a host (in a row) before it's given up.
+        :param probe_timeout: the number of seconds after which a probe without a result is given up (it should be
+        longer than a connection may take).
+        """
+        self.states = states
+        self.lock = lock
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_opens = max_opens
+        self.probe_timeout = probe_timeout
+
+    def _state(self, host):
+        """
+        Returns the state of a host: the failed items, the number of items failed in a row, the number of pauses, the
+        end of the pause and the probe connection (a tuple of its item and the time it's given up, None if there is no
+        probe).
+        """
+        return self.states.get(host, ((), 0, 0, 0, None))
+
+    def _set_state(self, host, state):
+        """Stores the state of a host; a host without failures is removed."""
+        if state == ((), 0, 0, 0, None):
+            self.states.pop(host, None)
+        else:
+            self.states[host] = state
+
+    def allow(self, host, item=None):
+        """
+        Checks whether a connection to a host may go out.
+        :param host: the host (domain) to connect to.
+        :param item: the item to connect for.
+        :return: 0 if the connection may go out, otherwise the number of seconds until the host should be tried again
+        (math.inf if the host is down).
+        """
+        if not self.threshold:
+            return 0
+        with self.lock:
+            items, failures, opens, until, probe = self._state(host)
+            if failures < self.threshold or item is not None and item in items:
+                return 0
+            now = time.time()
+            if now < until:
+                return until - now
+            if probe is not None and probe[0] == item:
+                # The probe's item was taken again before its probe was cancelled
+                return 0
+            if probe is not None and now < probe[1]:
+                # Another worker is probing the host; its result is awaited for a while
+                return min(self.cooldown, 5, probe[1] - now)
+            self.states[host] = (items, failures, opens, until, (item, now + self.probe_timeout))
+            return 0
+
+    def cancel(self, host, item):
+        """Cancels the probe of a host if it's made for the given item, e.g. when the item goes back into the queue."""
+        if self.threshold and host in self.states:
+            with self.lock:
+                items, failures, opens, until, probe = self._state(host)
+                if probe is not None and probe[0] == item:
+                    self._set_state(host, (items, failures, opens, until, None))
+
+    def success(self, host):
+        """Records a successful connection to a host, which closes its circuit."""
+        if self.threshold and host in self.states:
+            with self.lock:
+                items, failures, opens, until, probe = self._state(host)
+                if (failures, opens, until, probe) != (0, 0, 0, None):
+                    self._set_state(host, (items, 0, 0, 0, None))
+
+    def failure(self, host, item=None):
+        """
+        Records a transient failure on a host.
+        :param host: the host (domain) of the failed connection.
+        :param item: the item of the failed connection; an item that already failed is not counted again.
+        :return: the number of seconds the host is paused for if the failure opened its circuit (math.inf if the host
+        is down for good), otherwise 0.
+        """
+        if not self.threshold:
+            return 0
+        with self.lock:
+            items, failures, opens, until, probe = self._state(host)
+            if item is not None and item in items:
+                return 0
+            # The probe's item is remembered as well, so its retries don't probe the host again
+            items, failures = items + (item,), failures + 1
+            if (probe is None or probe[0] != item) and (failures < self.threshold or time.time() < until):
+                # Below the threshold, or the circuit is already open and the failure belongs to a connection made
+                # before it opened
+                self.states[host] = (items, failures, opens, until, probe)
+                return 0
+            pause = self.cooldown * 2 ** opens if opens < self.max_opens else math.inf
+            self.states[host] = (items, failures, opens + 1, time.time() + pause, None)
+            return pause
+
+    def forget(self, host, item):
+        """
+        Forgets a failed item of a host once it was scraped or given up. Its failure no longer counts, so the circuit
+        closes once fewer than 'threshold' failed items are left (unless the host is down for good).
+        """
+        if self.threshold and host in self.states:
+            with self.lock:
+                items, failures, opens, until, probe = self._state(host)
+                if item not in items:
+                    return
+                items, failures = tuple(other for other in items if other != item), max(failures - 1, 0)
+                if failures < self.threshold and until != math.inf:
+                    opens, until, probe = 0, 0, None
+                self._set_state(host, (items, failures, opens, until, probe))
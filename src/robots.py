@@ -0,0 +1,116 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from urllib.request import Request, urlopen  # Plain HTTP connections
+from urllib.error import HTTPError, URLError  # HTTP connection errors
+import socket  # Connection timeouts
+import json  # Cache file format
+import time  # Cache expiry
+import os  # Module with tools for working with files and folders
+import threading  # Thread identification for temporary files
+
+
+def parse_robots(text, agents=("*",)):
+    """
+    Parses the content of a robots.txt file (RFC 9309) and returns the rules for the given user agents. The groups
+    naming any of the (non-'*') agents are used if they exist, otherwise the groups for all agents ('*').
+    :param text: the content of the robots.txt file.
+    :param agents: the names of the user agents.
+    :return: a list of disallowed paths, a list of allowed paths and the crawl delay in seconds (None if not given).
+    """
+    agents = [agent.lower() for agent in agents if agent and agent != "*"]
+    groups, group, in_agents = [], None, False
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = [part.strip() for part in line.split(":", 1)]
+        key = key.lower()
+        if key == "user-agent":
+            # Consecutive user-agent lines share the same group
+            if not in_agents:
+                group = {"agents": [], "disallow": [], "allow": [], "crawl-delay": None}
+                groups.append(group)
+            group["agents"].append(value.lower())
+            in_agents = True
+            continue
+        in_agents = False
+        if group is None:
+            continue
+        if key in ("disallow", "allow") and value:
+            group[key].append(value)
+        elif key == "crawl-delay":
+            try:
+                group["crawl-delay"] = float(value)
+            except ValueError:
+                pass
+    selected = [group for group in groups if any(agent in group["agents"] for agent in agents)]
+    if not selected:
+        selected = [group for group in groups if "*" in group["agents"]]
+    disallow, allow, delays = [], [], []
+    for group in selected:
+        disallow.extend(rule for rule in group["disallow"] if rule not in disallow)
+        allow.extend(rule for rule in group["allow"] if rule not in allow)
+        if group["crawl-delay"] is not None:
+            delays.append(group["crawl-delay"])
+    return disallow, allow, (max(delays) if delays else None)
+
+
+def fetch_robots(base, user_agent="custombot", timeout=20, tries=2):
+    """
+    Downloads the robots.txt (or Robots.txt) file of a domain over plain HTTP.
+    :param base: the scheme and domain of the site, e.g. 'https://www.example.com'.
+    :param user_agent: the user agent string sent with the request.
+    :param timeout: the connection timeout in seconds.
+    :param tries: the number of attempts on connection errors.
+    :return: the content of the file, or an empty string if the site has no robots file.
+    """
+    for name in ("robots.txt", "Robots.txt"):
+        for k in range(max(1, tries)):
+            try:
+                request = Request(base + "/" + name, headers={"User-Agent": user_agent})
+                with urlopen(request, timeout=timeout) as response:
+                    charset = response.headers.get_content_charset() or "utf8"
+                    return response.read().decode(charset, errors="replace")
+            except HTTPError as e:
+                if 400 <= e.code < 500:
+                    break
+                if k + 1 == max(1, tries):
+                    raise
+            except (URLError, socket.timeout):
+                if k + 1 == max(1, tries):
+                    raise
+    return ""
+
+
+class RobotsCache(object):
+    """
+    A JSON file cache of parsed robots rules per domain. Entries older than 'expiry' seconds are ignored, so that repeated
+    runs skip the download of robots files until they expire.
+    """
+
+    def __init__(self, path, expiry=86400):
+        self.path = path
+        self.expiry = expiry
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf8") as cache:
+                return json.load(cache)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, domain):
+        """Returns the cached (disallow, allow, crawl_delay) of a domain, or None if missing or expired."""
+        entry = self._load().get(domain)
+        if entry is None or time.time() - entry["fetched"] > self.expiry:
+            return None
+        return entry["disallow"], entry["allow"], entry["crawl_delay"]
+
+    def set(self, domain, disallow, allow, crawl_delay):
+        """Stores the rules of a domain. The file is replaced atomically, since several Drivers may share it."""
+        content = self._load()
+        content[domain] = {"fetched": time.time(), "disallow": disallow, "allow": allow, "crawl_delay": crawl_delay}
+        tmp = "%s.%d.%d.tmp" % (self.path, os.getpid(), threading.get_ident())
+        with open(tmp, "w", encoding="utf8") as cache:
+            json.dump(content, cache)
+        os.replace(tmp, self.path)
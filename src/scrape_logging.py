@@ -0,0 +1,126 @@
+#!/usr/bin/env bash
+# -*- coding: utf-8 -*-
+from logging.handlers import QueueHandler, QueueListener  # Sending log records to a single writer
+from contextlib import contextmanager  # Writer of a logfile for the duration of a scraping process
+from multiprocessing import Queue  # Queue of log records shared between processes
+import logging  # Python logging mechanics
+import threading  # Guarding the loggers shared by threads
+import json  # Structured (JSON lines) logfiles
+
+# The loggers of the logfiles used in this process, and the writers of the logfiles, by their paths
+_loggers = dict()
+_listeners = dict()
+_lock = threading.Lock()
+
+
+class _TextFormatter(logging.Formatter):
+    """Formats a record as a line of a plain text logfile: blank lines, a timestamp and the message."""
+
+    def __init__(self):
+        super().__init__("%(blank)s%(asctime)s:\t%(message)s", "%d.%m.%Y %H:%M:%S")
+
+
+class _JsonFormatter(logging.Formatter):
+    """Formats a record as a line of a JSON lines logfile, with its structured fields."""
+
+    def format(self, record):
+        return json.dumps({"time": self.formatTime(record, "%Y-%m-%d %H:%M:%S") + ".%03d" % record.msecs,
+                           "process": record.process, "driver": record.driver, "url": record.url,
+                           "phase": record.phase, "message": record.getMessage().strip()}, ensure_ascii=False)
+
+
+def _file_handler(path):
+    """Returns a handler writing to the logfile; a logfile with the suffix '.jsonl' is written in JSON lines."""
+    handler = logging.FileHandler(path, encoding="utf8", delay=True)
+    handler.setFormatter(_JsonFormatter() if path.endswith(".jsonl") else _TextFormatter())
+    return handler
+
+
+def get_logger(path):
+    """
+    Returns the logger of a logfile. Unless a writer was started (see start_writer), the logger writes to the file
+    itself, which is kept open between the messages.
+    """
+    with _lock:
+        if path not in _loggers:
+            logger = logging.Logger(path, logging.INFO)
+            logger.propagate = False
+            logger.addHandler(_file_handler(path))
+            _loggers[path] = logger
+        return _loggers[path]
+
+
+def log(path, message, nblank=0, driver="", url="", phase=""):
+    """
+    Saves a message to a logfile.
+    :param path: path to the logfile.
+    :param message: the message.
+    :param nblank: number of blank lines before the message.
+    :param driver: the name of the Driver (or Scraper) the message is about.
+    :param url: the internet address the message is about.
+    :param phase: the phase of the scraping the message is about, e.g. "connect", "robots", "scrape" or "close".
+    """
+    get_logger(path).info(message, extra={"blank": "\n" * nblank, "driver": driver, "url": url if url else "",
+                                          "phase": phase})
+
+
+def _set_handler(path, handler):
+    logger = get_logger(path)
+    with _lock:
+        for old in list(logger.handlers):
+            logger.removeHandler(old)
+            old.close()
+        logger.addHandler(handler)
+
+
+def attach_queue(path, queue):
+    """Sends the messages to a logfile from this process (e.g. a worker) to the writer's queue (see start_writer)."""
+    _set_handler(path, QueueHandler(queue))
+
+
+def start_writer(path):
+    """
+    Starts a single writer of a logfile on a thread of this process. From then on the messages of this process, and of
+    the processes and threads which attach to the returned queue, are written by it in the order they arrive, so the
+    messages of all workers are merged while they are written. A writer already running for the logfile is reused.
+    :return: the queue of the writer.
+    """
+    with _lock:
+        if path in _listeners:
+            _listeners[path][2] += 1
+            return _listeners[path][1]
+        queue = Queue()
+        listener = QueueListener(queue, _file_handler(path))
+        _listeners[path] = [listener, queue, 1]
+    attach_queue(path, queue)
+    listener.start()
+    return queue
+
+
+def stop_writer(path):
+    """Stops the writer of a logfile once it's no longer used; the messages are then again written directly."""
+    with _lock:
+        if path not in _listeners:
+            return
+        _listeners[path][2] -= 1
+        if _listeners[path][2] > 0:
+            return
+        listener, queue, _ = _listeners.pop(path)
+    # The messages of this process go to the file again before the writer writes the last ones in its queue
+    _set_handler(path, _file_handler(path))
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+@contextmanager
+def log_writer(path):
+    """A single writer of a logfile (see start_writer) within a 'with' block. Yields its queue, or None without a path."""
+    if not path:
+        yield None
+        return
+    queue = start_writer(path)
+    try:
+        yield queue
+    finally:
+        stop_writer(path)
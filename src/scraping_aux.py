@@ -10,14 +10,15 @@ from selenium.webdriver.remote.webelement import WebElement  # Non-Firefox brows
 from datetime import datetime, timedelta  # Date and time functionality and operations
 from time import sleep  # Pausing python
 from selenium.common.exceptions import StaleElementReferenceException  # Dealing with errors in changing pages
+from link_index import LinkIndex  # Persistent index of previously scraped links
 
 # Win10 fix for printing into a custom stdout (e.g. logfile)
 import win_unicode_console
 win_unicode_console.enable()
 
 
-def check_previous_links(domain_name, archive_dir, other_chs=None):
-    """Checks previously scraped files to avoid duplicated scraping; it is supposed these files are in .csv format"""
+def _previous_files(domain_name, archive_dir, other_chs=None):
+    """Lists the .csv files in the archive directory with the domain name (and other characteristics) in their name"""
     previous_files = [file for file in os.listdir(archive_dir) if
                       domain_name.lower() in file.lower() and file.endswith("csv") and not file.startswith("JSON")]
     other_chs = [] if other_chs is None else other_chs
@@ -25,8 +26,13 @@ def check_previous_links(domain_name, archive_dir, other_chs=None):
         other_chs = [other_chs]
     if other_chs:
         previous_files = [file for file in previous_files if all(map(lambda x: x.lower() in file.lower(), other_chs))]
+    return previous_files
+
+
+def check_previous_links(domain_name, archive_dir, other_chs=None):
+    """Checks previously scraped files to avoid duplicated scraping; it is supposed these files are in .csv format"""
     previous_links = []
-    for file in previous_files:
+    for file in _previous_files(domain_name, archive_dir, other_chs):
         with open(os.path.join(archive_dir, file), "r", encoding="utf8") as article_links:
             reader = csv.reader(article_links, delimiter=";")
             articles = [row[0] for row in reader][1:]
@@ -34,6 +40,18 @@ def check_previous_links(domain_name, archive_dir, other_chs=None):
     return previous_links
 
 
+def previous_links_index(domain_name, archive_dir, other_chs=None, index_path=None):
+    """
+    Same as check_previous_links, but returns a persistent LinkIndex which only reads the archived files that are new
+    since the last call. Membership is tested with 'link in index' (or index.seen(link)) without loading the links.
+    """
+    other_chs = [other_chs] if isinstance(other_chs, str) else ([] if other_chs is None else other_chs)
+    index_path = os.path.join(archive_dir, "link_index.sqlite") if index_path is None else index_path
+    index = LinkIndex(index_path, key="|".join([domain_name.lower()] + sorted(ch.lower() for ch in other_chs)))
+    index.update([os.path.join(archive_dir, file) for file in _previous_files(domain_name, archive_dir, other_chs)])
+    return index
+
+
 def schedule_scraping(module, dateandtime=""):
     if dateandtime == "":
         dateandtime = datetime.fromtimestamp(datetime.now().timestamp() - 60).strftime("%d.%m.%Y/%H:%M")